@@ -1,18 +1,37 @@
-from flask import Flask, render_template, request, jsonify, send_file, session, redirect
+import time
+# 启动计时：模块加载完成时输出耗时与内存（见文件末尾）
+_STARTUP_BEGAN = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, jsonify, send_file, session, redirect, stream_with_context, url_for
 import asyncio
 import re
 import requests
 import json
 import os
-import base64
-from datetime import datetime
-from crawl4ai import AsyncWebCrawler
+import gzip
+import hashlib
+import binascii
+import html
+from datetime import datetime, timedelta
 import secrets
-import io
+import sqlite3
+import threading
+import queue
+import shutil
+import sys
 from urllib.parse import urlparse, quote
-from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
 from functools import lru_cache
+from collections import OrderedDict
+from contextlib import contextmanager
+import mimetypes
+from werkzeug.utils import safe_join
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# 可选依赖：安装 brotli 后支持 br 压缩，否则仅 gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__, static_url_path='/aizaobao/static')
 # 从环境变量读取secret key，如果没有则生成一个临时的
@@ -34,15 +53,72 @@ DEFAULT_CONFIG = {
     'sample_rate': 32000,
     'bitrate': 128000,
     'format': 'mp3',
-    'weather_location': '天津'
+    'weather_location': '天津',
+    # 早报区域（bohai/yangtze/haixi/pearl），留空则按天气位置推断
+    'region': ''
 }
 
-# 简易天气缓存（内存级，重启失效）
-_weather_cache = {
-    'key': None,
-    'data': None,
-    'ts': None
+# 天气缓存：位置 -> {'data': 解析后的天气, 'ts': 获取时间}，按最近使用排序（LRU），持久化到 cache/weather.json
+_weather_cache = OrderedDict()
+
+# 运行指标：进程内计数器与直方图，/aizaobao/metrics 以 Prometheus 文本格式输出
+# 名称 -> (类型, 说明, 标签名)
+METRICS = {
+    'aizaobao_crawl_source_seconds': ('histogram', '各来源抓取耗时', ('source',)),
+    'aizaobao_crawl_errors_total': ('counter', '各来源抓取失败次数', ('source',)),
+    'aizaobao_crawl_items_total': ('counter', '各来源按提取层级（markdown/rss/html）产出的条目数', ('source', 'tier')),
+    'aizaobao_news_stage_seconds': ('histogram', '新闻获取与版次构建各阶段耗时', ('stage',)),
+    'aizaobao_translation_cache_total': ('counter', '标题翻译缓存查询（hit/miss）', ('result',)),
+    'aizaobao_translation_seconds': ('histogram', '翻译接口请求耗时', ()),
+    'aizaobao_edition_cache_total': ('counter', '版次响应体查询（memory/db/rebuilt/missing）', ('result',)),
+    'aizaobao_history_query_seconds': ('histogram', '历史列表与详情查询耗时', ('kind',)),
+    'aizaobao_tts_stage_seconds': ('histogram', '生成音频各阶段耗时', ('stage',)),
+    'aizaobao_tts_request_seconds': ('histogram', 'Minimax 请求耗时', ('mode',)),
+    'aizaobao_tts_bytes_total': ('counter', 'Minimax 返回的音频字节数', ('mode',)),
+    'aizaobao_tts_errors_total': ('counter', 'Minimax 请求失败次数', ('mode',)),
+    'aizaobao_weather_request_seconds': ('histogram', 'wttr.in 请求耗时', ('result',)),
+    'aizaobao_startup_seconds': ('gauge', '模块加载耗时', ()),
+    'aizaobao_resident_memory_bytes': ('gauge', '进程常驻内存', ()),
 }
+METRIC_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# 多进程部署（CRAWL_MODE=worker）时各进程定期把指标快照写入该目录，指标接口合并输出
+METRICS_DIR = os.path.join('cache', 'metrics')
+METRICS_SNAPSHOT_INTERVAL = 15
+# (名称, 标签值) -> 计数/数值，直方图为 [各桶计数, 总和, 次数]
+_metric_values = {}
+_metrics_lock = threading.Lock()
+_metrics_writer_pid = None
+
+def metric_inc(name, value=1, **labels):
+    """计数器加 value"""
+    key = (name, tuple(str(labels[k]) for k in METRICS[name][2]))
+    with _metrics_lock:
+        _metric_values[key] = _metric_values.get(key, 0) + value
+    _ensure_metrics_writer()
+
+def metric_observe(name, seconds, **labels):
+    """直方图记录一次耗时"""
+    key = (name, tuple(str(labels[k]) for k in METRICS[name][2]))
+    with _metrics_lock:
+        hist = _metric_values.get(key)
+        if hist is None:
+            hist = _metric_values[key] = [[0] * len(METRIC_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(METRIC_BUCKETS):
+            if seconds <= bound:
+                hist[0][i] += 1
+                break
+        hist[1] += seconds
+        hist[2] += 1
+    _ensure_metrics_writer()
+
+@contextmanager
+def metric_timer(name, **labels):
+    """计时上下文：退出时（含异常）记录耗时"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric_observe(name, time.perf_counter() - started, **labels)
 
 # 航运新闻来源（可按需增删）
 SHIPPING_SOURCES = [
@@ -234,6 +310,71 @@ def get_user_config():
     config = session.get('config', DEFAULT_CONFIG.copy())
     return config
 
+def get_request_region():
+    """当前请求的早报区域：查询参数 region 优先，其次用户配置"""
+    config = get_user_config()
+    return _resolve_region(
+        request.args.get('region') or config.get('region'),
+        config.get('weather_location')
+    )
+
+def get_request_format():
+    """当前请求的早报产物格式（html/text/markdown/tts/items），非法值返回 None"""
+    fmt = request.args.get('format') or 'html'
+    return fmt if fmt in EDITION_FORMATS else None
+
+# HTTP 缓存策略：当前版次每次校验，过往历史永久不变，天气与其缓存有效期一致
+CACHE_CONTROL_REVALIDATE = 'no-cache'
+CACHE_CONTROL_IMMUTABLE = 'public, max-age=31536000, immutable'
+WEATHER_TTL = int(os.getenv('WEATHER_TTL', '600'))
+
+def cacheable_response(response, cache_control, etag=None):
+    """为成功响应附加 ETag/Cache-Control，并按 If-None-Match 返回 304"""
+    if etag:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+    response.headers['Cache-Control'] = cache_control
+    # 区域、天气位置等默认取自会话配置
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+# 动态压缩：超过该大小的文本类响应按 Accept-Encoding 压缩
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript', 'text/javascript'
+}
+
+def negotiate_encoding():
+    """按客户端 Accept-Encoding 选择压缩方式：br（需安装 brotli）> gzip > 不压缩"""
+    accept = request.accept_encodings
+    if brotli and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+@app.after_request
+def compress_response(response):
+    """对未预压缩的文本类响应做动态压缩（文件流与已压缩响应跳过）"""
+    if (response.direct_passthrough or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = negotiate_encoding()
+    response.vary.add('Accept-Encoding')
+    if not encoding:
+        return response
+    response.set_data(brotli.compress(data, quality=5) if encoding == 'br' else gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+    # 弱化强 ETag：压缩后字节不同
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
 def update_user_config(new_config):
     """更新用户配置"""
     config = get_user_config()
@@ -375,6 +516,8 @@ def _fallback_extract_source(source_url: str, max_items: int = 8) -> list:
         resp = requests.get(source_url, headers=headers, timeout=12)
         if resp.status_code != 200:
             return []
+        # 仅后备解析用到，按需导入，只提供 Web 服务的进程不加载
+        from bs4 import BeautifulSoup
         html = resp.text
         soup = BeautifulSoup(html, 'html.parser')
         rules = SOURCE_RULES.get((urlparse(source_url).hostname or '').lower())
@@ -457,6 +600,7 @@ def _rss_fallback_titles(hostname: str, max_items: int = 10) -> list:
         resp = requests.get(feed_url, timeout=10)
         if resp.status_code != 200:
             return []
+        import xml.etree.ElementTree as ET
         results = []
         root = ET.fromstring(resp.text)
         for item in root.iter('item'):
@@ -483,10 +627,11 @@ def _translate_to_zh(text: str) -> str:
         # 简单双词不翻译
         if len(text.split()) <= 2:
             return text
-        resp = requests.get(
-            'https://api.mymemory.translated.net/get',
-            params={'q': text, 'langpair': 'en|zh-CN'}, timeout=8
-        )
+        with metric_timer('aizaobao_translation_seconds'):
+            resp = requests.get(
+                'https://api.mymemory.translated.net/get',
+                params={'q': text, 'langpair': 'en|zh-CN'}, timeout=8
+            )
         if resp.status_code == 200:
             data = resp.json()
             translated = data.get('responseData', {}).get('translatedText')
@@ -496,7 +641,54 @@ def _translate_to_zh(text: str) -> str:
     except Exception:
         return text
 
-def format_news(markdown_or_items):
+# 早报产物格式：构建时一次性渲染并随缓存保存，接口按 format 参数直接返回
+EDITION_FORMATS = ('html', 'text', 'markdown', 'tts', 'items')
+
+def _normalize_items(items) -> list:
+    """统一为 {'title','url','source'} 字典列表"""
+    result = []
+    for item in items:
+        if isinstance(item, dict):
+            result.append({
+                'title': item.get('title') or '',
+                'url': item.get('url') or '',
+                'source': item.get('source') or ''
+            })
+        else:
+            result.append({'title': str(item), 'url': '', 'source': ''})
+    return result
+
+def render_edition(items, date_str) -> dict:
+    """将新闻条目一次性渲染为多种产物：HTML 片段、纯文本、Markdown、朗读稿与 JSON 条目"""
+    items = _normalize_items(items)[:10]
+    heading = f"{date_str} 航运早报"
+    html_lines = [html.escape(heading, quote=False)]
+    text_lines = [heading]
+    md_lines = [f"# {heading}"]
+    tts_parts = [f"{heading}。"]
+    for i, it in enumerate(items, 1):
+        title, url, src = it['title'], it['url'], it['source']
+        src_note = f"（来源：{src}）" if src else ''
+        title_html = html.escape(title, quote=False)
+        if url:
+            html_lines.append(
+                f"{i}、<a href=\"{html.escape(url)}\" target=\"_blank\" rel=\"noopener\">{title_html}</a>{html.escape(src_note, quote=False)}"
+            )
+            md_lines.append(f"{i}. [{title}]({url}){src_note}")
+        else:
+            html_lines.append(f"{i}、{title_html}{html.escape(src_note, quote=False)}")
+            md_lines.append(f"{i}. {title}{src_note}")
+        text_lines.append(f"{i}、{title}{src_note}")
+        tts_parts.append(f"第{i}条，{title.rstrip('。.')}。")
+    return {
+        'html': '\n\n'.join(html_lines),
+        'text': '\n\n'.join(text_lines),
+        'markdown': '\n\n'.join(md_lines),
+        'tts': remove_newlines(''.join(tts_parts)),
+        'items': items
+    }
+
+def format_news(markdown_or_items, date_str=None):
     """
     将抓取的内容（Markdown或标题列表）格式化为航运早报
     返回: formatted_output, news_items (<=10), date_str
@@ -507,27 +699,18 @@ def format_news(markdown_or_items):
     else:
         items = list(markdown_or_items or [])[:10]
 
-        date_str = datetime.now().strftime("%Y年%m月%d日")
-    
-    formatted_output = f"{date_str} 航运早报\n\n"
-    news_items_plain = []
-    for i, item in enumerate(items[:10], 1):
-        if isinstance(item, dict):
-            title = item.get('title') or ''
-            url = item.get('url') or ''
-            src = item.get('source') or ''
-            news_items_plain.append(title)
-            if url:
-                formatted_output += f"{i}、<a href=\"{url}\" target=\"_blank\" rel=\"noopener\">{title}</a>（来源：{src}）\n\n"
-            else:
-                formatted_output += f"{i}、{title}（来源：{src}）\n\n"
-        else:
-            text = str(item)
-            news_items_plain.append(text)
-            formatted_output += f"{i}、{text}\n\n"
-    formatted_output = formatted_output.rstrip('\n')
-    
-    return formatted_output, news_items_plain[:10], date_str
+    date_str = date_str or datetime.now().strftime("%Y年%m月%d日")
+    artifacts = render_edition(items, date_str)
+    return artifacts['html'], [it['title'] for it in artifacts['items']], date_str
+
+def get_edition_artifacts(cache_data) -> dict:
+    """读取缓存中的预渲染产物；旧缓存没有产物时按标题临时渲染"""
+    artifacts = cache_data.get('artifacts')
+    if artifacts:
+        return artifacts
+    artifacts = render_edition(cache_data.get('news_items') or [], cache_data.get('date_str') or '')
+    artifacts['html'] = cache_data.get('formatted_news') or artifacts['html']
+    return artifacts
 
 def remove_newlines(text):
     """
@@ -542,78 +725,630 @@ def create_cache_folder():
         os.makedirs(cache_folder)
     return cache_folder
 
-def get_cache_file_path():
-    """获取当天的缓存文件路径"""
+def _parse_edition_slots(value: str) -> list:
+    """解析版次时间配置（如 "07:00,16:00"），返回排序后的 HHMM 列表"""
+    slots = set()
+    for part in (value or '').split(','):
+        m = re.match(r'^\s*(\d{1,2}):(\d{2})\s*$', part)
+        if m and int(m.group(1)) < 24 and int(m.group(2)) < 60:
+            slots.add(f"{int(m.group(1)):02d}{m.group(2)}")
+    return sorted(slots) or ['0700']
+
+# 每日版次（早报/午后版等），每个版次独立缓存、历史与音频
+EDITION_SLOTS = _parse_edition_slots(os.getenv('EDITION_SLOTS', '07:00,16:00'))
+
+def get_current_edition(now=None):
+    """返回当前应展示的版次 (cache_date, slot)：当天已到点的最新版次，首个版次之前沿用前一天最后一版"""
+    now = now or datetime.now()
+    hhmm = now.strftime("%H%M")
+    passed = [slot for slot in EDITION_SLOTS if slot <= hhmm]
+    if passed:
+        return now.strftime("%Y-%m-%d"), passed[-1]
+    return (now - timedelta(days=1)).strftime("%Y-%m-%d"), EDITION_SLOTS[-1]
+
+def _edition_id(cache_date, slot=None):
+    """版次标识：YYYY-MM-DD_HHMM（旧版按天缓存无版次时为 YYYY-MM-DD）"""
+    return f"{cache_date}_{slot}" if slot else cache_date
+
+def _parse_edition_id(edition_id):
+    """解析版次标识，返回 (cache_date, slot)；格式错误返回 (None, None)"""
+    m = re.match(r'^(\d{4}-\d{2}-\d{2})(?:_(\d{4}))?$', edition_id or '')
+    if not m:
+        return None, None
+    return m.group(1), m.group(2)
+
+def _slot_label(slot) -> str:
+    """版次显示名，如 0700 -> 07:00版"""
+    return f"{slot[:2]}:{slot[2:]}版" if slot else ''
+
+def get_cache_file_path(region=None, cache_date=None, slot=None):
+    """获取指定区域/版次的缓存文件路径：news_YYYY-MM-DD_HHMM[_region].json（默认区域不带后缀）"""
     cache_folder = create_cache_folder()
-    today = datetime.now().strftime("%Y-%m-%d")
-    return os.path.join(cache_folder, f"news_{today}.json")
+    if cache_date is None:
+        cache_date, slot = get_current_edition()
+    region = region or DEFAULT_REGION
+    suffix = '' if region == DEFAULT_REGION else f"_{region}"
+    return os.path.join(cache_folder, f"news_{_edition_id(cache_date, slot)}{suffix}.json")
+
+def _parse_cache_filename(filename):
+    """解析缓存文件名，返回 (cache_date, slot, region)；非新闻缓存返回 (None, None, None)"""
+    m = re.match(r'^news_(\d{4}-\d{2}-\d{2})(?:_(\d{4}))?(?:_([a-z]+))?\.json$', filename)
+    if not m:
+        return None, None, None
+    return m.group(1), m.group(2), m.group(3) or DEFAULT_REGION
+
+# 版次库：SQLite 按 (region, cache_date, slot) 建主键索引，历史列表/详情/区间查询不再扫描目录
+EDITION_DB_PATH = os.getenv('EDITION_DB', os.path.join('cache', 'editions.db'))
+# 是否同时导出 news_*.json 文件（便于备份或旧工具读取）
+EXPORT_EDITION_FILES = os.getenv('EXPORT_EDITION_FILES', '1') == '1'
+# 历史保留天数，0 表示永久保留
+HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', '30'))
+
+_db_local = threading.local()
+_db_init_lock = threading.Lock()
+_db_initialized = False
+
+EDITION_COLUMNS = [
+    'region', 'cache_date', 'slot', 'edition_id', 'date_str', 'cached_time',
+    'formatted_news', 'news_items', 'artifacts', 'audio_url', 'content_hash'
+]
 
-def save_news_cache(formatted_news, news_items, date_str):
-    """保存新闻缓存"""
+def _init_edition_db(conn):
+    """建表并导入已有的 news_*.json 文件（仅首次）"""
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS editions (
+            region TEXT NOT NULL,
+            cache_date TEXT NOT NULL,
+            slot TEXT NOT NULL DEFAULT '',
+            edition_id TEXT NOT NULL,
+            date_str TEXT,
+            cached_time TEXT,
+            formatted_news TEXT,
+            news_items TEXT,
+            artifacts TEXT,
+            audio_url TEXT,
+            content_hash TEXT,
+            PRIMARY KEY (region, cache_date, slot)
+        );
+        CREATE INDEX IF NOT EXISTS idx_editions_date ON editions (cache_date);
+        CREATE TABLE IF NOT EXISTS edition_bodies (
+            region TEXT NOT NULL,
+            cache_date TEXT NOT NULL,
+            slot TEXT NOT NULL DEFAULT '',
+            fmt TEXT NOT NULL,
+            etag TEXT NOT NULL,
+            body BLOB NOT NULL,
+            body_gz BLOB,
+            body_br BLOB,
+            PRIMARY KEY (region, cache_date, slot, fmt)
+        );
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            dedupe_key TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            progress TEXT,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+        CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key, status);
+    """)
+    # 旧库补充新增列
+    existing = {r['name'] for r in conn.execute("PRAGMA table_info(editions)")}
+    if 'content_hash' not in existing:
+        conn.execute("ALTER TABLE editions ADD COLUMN content_hash TEXT")
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'files_imported'").fetchone():
+        return
+    imported = 0
+    cache_folder = create_cache_folder()
+    for filename in os.listdir(cache_folder):
+        file_date, file_slot, file_region = _parse_cache_filename(filename)
+        if not file_date:
+            continue
+        try:
+            with open(os.path.join(cache_folder, filename), 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+            cache_data.update({'region': file_region, 'cache_date': file_date, 'slot': file_slot})
+            _upsert_edition(conn, cache_data)
+            imported += 1
+        except Exception as e:
+            print(f"导入历史文件失败 {filename}: {e}")
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('files_imported', ?)", (datetime.now().isoformat(),))
+    conn.commit()
+    if imported:
+        print(f"已将 {imported} 个历史缓存文件导入版次库")
+
+def get_edition_db():
+    """获取当前线程的版次库连接（WAL 模式，读写互不阻塞）"""
+    global _db_initialized
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        create_cache_folder()
+        conn = sqlite3.connect(EDITION_DB_PATH, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        _db_local.conn = conn
+    if not _db_initialized:
+        with _db_init_lock:
+            if not _db_initialized:
+                _init_edition_db(conn)
+                _db_initialized = True
+    return conn
+
+# 任务队列（版次库 jobs 表）：CRAWL_MODE=worker 时 Web 进程只入队和读取结果，
+# 抓取、翻译与语音任务由 worker.py 进程执行，Web 进程可以放心开多个 worker
+CRAWL_MODE = os.getenv('CRAWL_MODE', 'inline').lower()
+IS_CRAWLER_PROCESS = os.getenv('CRAWLER_PROCESS') == '1'
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '2'))
+# 租约：运行中任务超过该时长未更新（worker 进程崩溃或被杀）即重新排队；worker 执行期间定期续约
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+JOB_RETENTION_SECONDS = 86400
+# 任务结束时从 payload 中清除 Minimax 凭据，结束的任务记录里不保留明文密钥
+JOB_SCRUB_PAYLOAD = "payload = json_remove(payload, '$.config.api_key', '$.config.group_id')"
+
+def crawl_locally() -> bool:
+    """当前进程是否直接执行抓取/语音任务（inline 模式或 worker 进程）"""
+    return CRAWL_MODE != 'worker' or IS_CRAWLER_PROCESS
+
+def _job_from_row(row):
+    job = dict(row)
+    for field in ('payload', 'progress', 'result'):
+        job[field] = json.loads(job[field]) if job.get(field) else None
+    return job
+
+def enqueue_job(kind, payload, dedupe_key=None) -> int:
+    """入队任务，返回任务ID；相同 dedupe_key 的任务未完成时直接复用"""
+    conn = get_edition_db()
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        cache_file = get_cache_file_path()
+        if dedupe_key:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running') ORDER BY id LIMIT 1",
+                (dedupe_key,)
+            ).fetchone()
+            if row:
+                conn.commit()
+                return row['id']
+        now = time.time()
+        job_id = conn.execute(
+            "INSERT INTO jobs (kind, payload, dedupe_key, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload, ensure_ascii=False), dedupe_key, now, now)
+        ).lastrowid
+        conn.commit()
+        return job_id
+    except Exception:
+        conn.rollback()
+        raise
+
+def claim_job():
+    """领取最早的排队任务（标记为 running），没有任务时返回 None"""
+    conn = get_edition_db()
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # 租约过期的运行中任务：还有重试次数的重新排队，否则标记失败
+        expired = time.time() - JOB_LEASE_SECONDS
+        conn.execute(
+            f"UPDATE jobs SET status = 'failed', error = '任务执行超时（租约过期）', updated_at = ?, {JOB_SCRUB_PAYLOAD} "
+            "WHERE status = 'running' AND updated_at < ? AND attempts >= ?",
+            (time.time(), expired, JOB_MAX_ATTEMPTS)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND updated_at < ?",
+            (expired,)
+        )
+        row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+        if row is None:
+            conn.commit()
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            (time.time(), row['id'])
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    job = _job_from_row(row)
+    job.update({'status': 'running', 'attempts': job['attempts'] + 1})
+    return job
+
+def update_job(job_id, **fields):
+    """更新任务状态/进度/结果（payload、progress、result 以 JSON 保存）；不传字段时仅续约"""
+    for field in ('payload', 'progress', 'result'):
+        if field in fields:
+            fields[field] = json.dumps(fields[field], ensure_ascii=False)
+    fields['updated_at'] = time.time()
+    assignments = [f'{k} = ?' for k in fields]
+    if fields.get('status') in ('done', 'failed'):
+        assignments.append(JOB_SCRUB_PAYLOAD)
+    conn = get_edition_db()
+    conn.execute(
+        f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?",
+        (*fields.values(), job_id)
+    )
+    conn.commit()
+
+def get_job(job_id):
+    row = get_edition_db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _job_from_row(row) if row else None
+
+def wait_for_job(job_id, timeout):
+    """轮询等待任务结束，返回任务；超时返回 None"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = get_job(job_id)
+        if job is None or job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.5)
+    return None
+
+def purge_old_jobs():
+    """删除一天前已结束的任务记录"""
+    conn = get_edition_db()
+    deleted = conn.execute(
+        "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+        (time.time() - JOB_RETENTION_SECONDS,)
+    ).rowcount
+    conn.commit()
+    return deleted
+
+def _edition_content_hash(cache_data) -> str:
+    """版次内容哈希（条目、产物、音频地址与构建时间），用作强 ETag"""
+    content = {
+        'date_str': cache_data.get('date_str'),
+        'cached_time': cache_data.get('cached_time'),
+        'news_items': cache_data.get('news_items'),
+        'formatted_news': cache_data.get('formatted_news'),
+        'artifacts': cache_data.get('artifacts'),
+        'audio_url': cache_data.get('audio_url'),
+    }
+    raw = json.dumps(content, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+def _upsert_edition(conn, cache_data):
+    """写入/覆盖一条版次记录"""
+    row = dict(cache_data)
+    row['content_hash'] = row.get('content_hash') or _edition_content_hash(row)
+    row['slot'] = row.get('slot') or ''
+    row['edition_id'] = _edition_id(row['cache_date'], row['slot'])
+    row['news_items'] = json.dumps(row.get('news_items') or [], ensure_ascii=False)
+    row['artifacts'] = json.dumps(row['artifacts'], ensure_ascii=False) if row.get('artifacts') else None
+    conn.execute(
+        f"INSERT OR REPLACE INTO editions ({', '.join(EDITION_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in EDITION_COLUMNS)})",
+        [row.get(col) for col in EDITION_COLUMNS]
+    )
+
+def _edition_from_row(row):
+    """数据库行转换为与 JSON 缓存一致的字典"""
+    data = dict(row)
+    data['slot'] = data.get('slot') or None
+    if 'news_items' in data:
+        data['news_items'] = json.loads(data['news_items'] or '[]')
+    if 'artifacts' in data:
+        data['artifacts'] = json.loads(data['artifacts']) if data['artifacts'] else None
+    if not data.get('audio_url'):
+        data.pop('audio_url', None)
+    return data
+
+# 历史列表摘要模式只读取的列（不含正文与产物）
+HISTORY_SUMMARY_COLUMNS = ['region', 'cache_date', 'slot', 'edition_id', 'date_str', 'cached_time', 'news_items']
+
+def query_editions(region=None, date_from=None, date_to=None, limit=None, before=None, columns=None):
+    """按区域与日期区间查询版次（按日期、版次倒序），走主键索引
+
+    before 为游标 (cache_date, slot)，只返回排在其后的版次（键集分页）。
+    """
+    sql = f"SELECT {', '.join(columns) if columns else '*'} FROM editions WHERE region = ?"
+    params = [region or DEFAULT_REGION]
+    if before:
+        sql += " AND (cache_date < ? OR (cache_date = ? AND slot < ?))"
+        params.extend([before[0], before[0], before[1] or ''])
+    if date_from:
+        sql += " AND cache_date >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += " AND cache_date <= ?"
+        params.append(date_to)
+    sql += " ORDER BY cache_date DESC, slot DESC"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return [_edition_from_row(r) for r in get_edition_db().execute(sql, params)]
+
+def _latest_slot_for_date(cache_date, region=None):
+    """查找某天已有的最新版次（兼容旧的按天缓存，返回 None）；无记录返回 False"""
+    row = get_edition_db().execute(
+        "SELECT slot FROM editions WHERE region = ? AND cache_date = ? ORDER BY slot DESC LIMIT 1",
+        (region or DEFAULT_REGION, cache_date)
+    ).fetchone()
+    if row is None:
+        return False
+    return row['slot'] or None
+
+def save_news_cache(formatted_news, news_items, date_str, region=None, cache_date=None, slot=None, extra=None):
+    """保存新闻缓存（写入版次库，按配置同时导出 JSON 文件）"""
+    try:
+        region = region or DEFAULT_REGION
+        if cache_date is None:
+            cache_date, slot = get_current_edition()
         cache_data = {
             'formatted_news': formatted_news,
             'news_items': news_items,
             'date_str': date_str,
+            'region': region,
+            'slot': slot,
+            'edition_id': _edition_id(cache_date, slot),
             'cached_time': datetime.now().isoformat(),
-            'cache_date': datetime.now().strftime("%Y-%m-%d")
+            'cache_date': cache_date
         }
+        if extra:
+            cache_data.update(extra)
+        
+        conn = get_edition_db()
+        _upsert_edition(conn, cache_data)
+        # 构建时一次性生成各格式的响应体及其压缩版本
+        for fmt in EDITION_FORMATS:
+            _store_edition_body(conn, cache_data, fmt)
+        conn.commit()
+        _bump_edition_generation()
         
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(cache_data, f, ensure_ascii=False, indent=2)
+        if EXPORT_EDITION_FILES:
+            cache_file = get_cache_file_path(region, cache_date, slot)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(cache_data, f, ensure_ascii=False, indent=2)
         
-        print(f"新闻缓存已保存: {cache_file}")
+        print(f"新闻缓存已保存: {cache_data['edition_id']} {region}")
         return True
     except Exception as e:
         print(f"保存缓存失败: {e}")
         return False
 
-def load_news_cache():
-    """加载新闻缓存"""
+def read_news_cache(region=None, cache_date=None, slot=None):
+    """读取指定版次的完整缓存数据，不存在返回 None"""
+    if cache_date is None:
+        cache_date, slot = get_current_edition()
+    row = get_edition_db().execute(
+        "SELECT * FROM editions WHERE region = ? AND cache_date = ? AND slot = ?",
+        (region or DEFAULT_REGION, cache_date, slot or '')
+    ).fetchone()
+    return _edition_from_row(row) if row else None
+
+# 版次代数文件：每次写入版次库后更新其 mtime，各进程据此判断内存缓存是否失效（一次 stat）
+EDITION_GENERATION_FILE = os.path.join('cache', '.edition_generation')
+
+_edition_body_cache = {'gen': None, 'bodies': {}}
+_edition_body_lock = threading.Lock()
+
+def _bump_edition_generation():
+    """标记版次库已变更，使所有进程的内存缓存失效"""
+    with open(EDITION_GENERATION_FILE, 'a'):
+        pass
+    os.utime(EDITION_GENERATION_FILE, ns=(time.time_ns(), time.time_ns()))
+
+def _edition_generation() -> int:
+    """当前版次代数（代数文件的纳秒级 mtime）"""
+    try:
+        return os.stat(EDITION_GENERATION_FILE).st_mtime_ns
+    except OSError:
+        return 0
+
+def _edition_payload(cache_data, fmt='html') -> dict:
+    """版次接口的响应数据（新闻与历史详情共用）"""
+    artifacts = get_edition_artifacts(cache_data)
+    return {
+        'success': True,
+        'content': artifacts[fmt],
+        'text': artifacts['text'],
+        'format': fmt,
+        'items': cache_data.get('news_items'),
+        'date_str': cache_data.get('date_str'),
+        'region': cache_data.get('region'),
+        'cache_date': cache_data.get('cache_date'),
+        'slot': cache_data.get('slot'),
+        'edition_id': cache_data.get('edition_id'),
+        'audio_url': cache_data.get('audio_url'),
+        'cached_time': cache_data.get('cached_time'),
+        'timestamp': cache_data.get('cached_time'),
+        'from_cache': True
+    }
+
+def _compress_variants(body: bytes) -> dict:
+    """预压缩响应体，返回 {'gzip': bytes, 'br': bytes|None}"""
+    return {
+        'gzip': gzip.compress(body, compresslevel=9, mtime=0),
+        'br': brotli.compress(body, quality=11) if brotli else None
+    }
+
+def _store_edition_body(conn, cache_data, fmt):
+    """序列化并预压缩某格式的版次响应体，写入 edition_bodies，返回缓存条目"""
+    body = json.dumps(_edition_payload(cache_data, fmt), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    content_hash = cache_data.get('content_hash') or _edition_content_hash(cache_data)
+    etag = f"{content_hash[:32]}-{fmt}"
+    variants = _compress_variants(body)
+    conn.execute(
+        "INSERT OR REPLACE INTO edition_bodies (region, cache_date, slot, fmt, etag, body, body_gz, body_br) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (cache_data.get('region') or DEFAULT_REGION, cache_data['cache_date'], cache_data.get('slot') or '',
+         fmt, etag, body, variants['gzip'], variants['br'])
+    )
+    return {'body': body, 'etag': etag, 'gzip': variants['gzip'], 'br': variants['br']}
+
+def get_edition_body(region, cache_date, slot, fmt='html'):
+    """返回预序列化、预压缩的版次响应条目 {'body','etag','gzip','br'}；版次不存在返回 None
+
+    命中内存缓存时不访问数据库；未命中时读取构建时保存的响应体（无 JSON 解析），
+    旧数据缺少响应体时现场生成并回填。
+    """
+    gen = _edition_generation()
+    key = (region, cache_date, slot or '', fmt)
+    bodies = _edition_body_cache['bodies']
+    if _edition_body_cache['gen'] == gen and key in bodies:
+        metric_inc('aizaobao_edition_cache_total', result='memory')
+        return bodies[key]
+    conn = get_edition_db()
+    row = conn.execute(
+        "SELECT etag, body, body_gz, body_br FROM edition_bodies "
+        "WHERE region = ? AND cache_date = ? AND slot = ? AND fmt = ?",
+        key
+    ).fetchone()
+    if row is not None:
+        entry = {'body': row['body'], 'etag': row['etag'], 'gzip': row['body_gz'], 'br': row['body_br']}
+        if entry['br'] is None and brotli:
+            entry['br'] = brotli.compress(entry['body'], quality=11)
+        metric_inc('aizaobao_edition_cache_total', result='db')
+    else:
+        cache_data = read_news_cache(region, cache_date, slot)
+        if cache_data is None:
+            metric_inc('aizaobao_edition_cache_total', result='missing')
+            return None
+        entry = _store_edition_body(conn, cache_data, fmt)
+        conn.commit()
+        metric_inc('aizaobao_edition_cache_total', result='rebuilt')
+    with _edition_body_lock:
+        if _edition_body_cache['gen'] != gen:
+            _edition_body_cache['gen'] = gen
+            _edition_body_cache['bodies'] = {}
+        _edition_body_cache['bodies'][key] = entry
+    return entry
+
+def edition_response(entry, cache_control):
+    """按 Accept-Encoding 直接返回预压缩的版次响应体"""
+    encoding = negotiate_encoding()
+    data = entry.get(encoding) if encoding else None
+    if data is None:
+        encoding = None
+        data = entry['body']
+    response = Response(data, mimetype='application/json')
+    etag = entry['etag']
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        # 不同编码是不同表示，强 ETag 需区分
+        etag = f"{etag}-{'br' if encoding == 'br' else 'gz'}"
+    response.vary.add('Accept-Encoding')
+    return cacheable_response(response, cache_control, etag)
+
+def load_news_cache(region=None):
+    """加载当前版次的新闻缓存"""
     try:
-        cache_file = get_cache_file_path()
+        cache_date, slot = get_current_edition()
+        cache_data = read_news_cache(region, cache_date, slot)
         
         # 检查缓存文件是否存在
-        if not os.path.exists(cache_file):
+        if cache_data is None:
             print("缓存文件不存在")
             return None, None, None
         
-        # 检查缓存文件是否为今天的
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
-        
-        # 验证缓存日期
-        if cache_data.get('cache_date') != today:
+        # 验证缓存版次
+        if cache_data.get('cache_date') != cache_date:
             print("缓存已过期")
             return None, None, None
         
-        print(f"从缓存加载新闻: {cache_file}")
+        print(f"从缓存加载新闻: {_edition_id(cache_date, slot)} {region or DEFAULT_REGION}")
         return cache_data['formatted_news'], cache_data['news_items'], cache_data['date_str']
         
     except Exception as e:
         print(f"加载缓存失败: {e}")
         return None, None, None
 
+# 候选池列顺序（紧凑存储为二维数组，避免每行重复字段名）
+POOL_FIELDS = ['title', 'url', 'source', 'title_raw']
+
+def get_pool_file_path(cache_date=None, slot=None):
+    """获取指定版次的候选池文件路径"""
+    cache_folder = create_cache_folder()
+    if cache_date is None:
+        cache_date, slot = get_current_edition()
+    return os.path.join(cache_folder, f"pool_{_edition_id(cache_date, slot)}.json.gz")
+
+def save_candidate_pool(candidates, cache_date=None, slot=None):
+    """保存完整候选池（含链接、来源与各区域得分），gzip 压缩的紧凑 JSON"""
+    try:
+        if cache_date is None:
+            cache_date, slot = get_current_edition()
+        pool_file = get_pool_file_path(cache_date, slot)
+        pool_data = {
+            'v': 1,
+            'cache_date': cache_date,
+            'slot': slot,
+            'cached_time': datetime.now().isoformat(),
+            'fields': POOL_FIELDS,
+            'rows': [[it.get(f) or '' for f in POOL_FIELDS] for it in candidates],
+            # 构建时的得分快照，便于离线对比排序规则变化
+            'scores': {key: [_score_item(it, key) for it in candidates] for key in REGION_PROFILES},
+        }
+        raw = json.dumps(pool_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        with gzip.open(pool_file, 'wb') as f:
+            f.write(raw)
+        print(f"候选池已保存: {pool_file}（{len(candidates)}条）")
+        return True
+    except Exception as e:
+        print(f"保存候选池失败: {e}")
+        return False
+
+def load_candidate_pool(cache_date=None, slot=None):
+    """加载指定版次的候选池，返回 dict 列表；不存在返回 None"""
+    try:
+        pool_file = get_pool_file_path(cache_date, slot)
+        if not os.path.exists(pool_file):
+            return None
+        with gzip.open(pool_file, 'rb') as f:
+            pool_data = json.loads(f.read().decode('utf-8'))
+        fields = pool_data.get('fields') or POOL_FIELDS
+        return [dict(zip(fields, row)) for row in pool_data.get('rows', [])]
+    except Exception as e:
+        print(f"加载候选池失败: {e}")
+        return None
+
+def _edition_date_str(cache_date, slot=None) -> str:
+    """版次显示日期，如 2025年08月12日 16:00版"""
+    date_str = datetime.strptime(cache_date, "%Y-%m-%d").strftime("%Y年%m月%d日")
+    return f"{date_str} {_slot_label(slot)}" if slot and len(EDITION_SLOTS) > 1 else date_str
+
+def regenerate_edition(cache_date, region=None, save=False, slot=None):
+    """用已保存的候选池按当前排序规则重新生成某版次某区域的早报（无需重新抓取）"""
+    region = _resolve_region(region)
+    candidates = load_candidate_pool(cache_date, slot)
+    if not candidates:
+        return None, None, None
+    date_str = _edition_date_str(cache_date, slot)
+    artifacts = render_edition(rank_candidates(candidates, region), date_str)
+    formatted_news, news_items = artifacts['html'], [it['title'] for it in artifacts['items']]
+    if save:
+        save_news_cache(
+            formatted_news, news_items, date_str, region=region, cache_date=cache_date, slot=slot,
+            extra={'artifacts': artifacts}
+        )
+    return formatted_news, news_items, date_str
+
 def clear_old_cache():
-    """清理旧的缓存文件（保留最近30天）"""
+    """清理超出保留期的版次记录（HISTORY_RETENTION_DAYS，默认30天；文件由后台清理任务按配额处理）"""
+    if HISTORY_RETENTION_DAYS <= 0:
+        return 0
     try:
-        cache_folder = create_cache_folder()
-        current_time = datetime.now()
-        
-        for filename in os.listdir(cache_folder):
-            if filename.startswith('news_') and filename.endswith('.json'):
-                file_path = os.path.join(cache_folder, filename)
-                # 获取文件修改时间
-                file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                # 如果文件超过30天，删除它
-                if (current_time - file_time).days > 30:
-                    os.remove(file_path)
-                    print(f"删除旧缓存文件: {filename}")
+        cutoff = (datetime.now() - timedelta(days=HISTORY_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        conn = get_edition_db()
+        deleted = conn.execute("DELETE FROM editions WHERE cache_date < ?", (cutoff,)).rowcount
+        conn.execute("DELETE FROM edition_bodies WHERE cache_date < ?", (cutoff,))
+        conn.commit()
+        if deleted:
+            _bump_edition_generation()
+            print(f"删除旧版次记录: {deleted} 条")
+        return deleted
     except Exception as e:
         print(f"清理缓存失败: {e}")
+        return 0
 
 # 新闻优先级关键词
 PRIORITY_KEYWORDS_LEVEL1 = [
@@ -640,93 +1375,267 @@ LINER_KEYWORDS = [
     '以星', 'ZIM'
 ]
 
-async def get_news_content():
-    """获取航运新闻内容（带缓存机制，多源聚合）"""
-    # 先尝试从缓存加载
-    cached_news, cached_items, cached_date = load_news_cache()
-    
-    if cached_news is not None:
-        print("使用缓存的新闻内容")
-        return cached_news, cached_items, cached_date
-    
-    print("从网络获取最新航运新闻")
-    try:
+# 区域早报配置：同一批候选新闻按不同区域关键词重新排序，生成各区域版本
+# level1 为区域核心关键词（+10），cities 用于根据天气位置推断所属区域
+REGION_PROFILES = {
+    'bohai': {
+        'name': '环渤海',
+        'level1': PRIORITY_KEYWORDS_LEVEL1,
+        'cities': ['天津', '塘沽', '大连', '烟台', '威海', '青岛', '唐山', '秦皇岛', '营口', '日照', '北京'],
+    },
+    'yangtze': {
+        'name': '长三角',
+        'level1': [
+            '上海', '上港', '洋山', '宁波', '舟山', '宁波舟山', '长江', '江苏', '浙江',
+            '南京', '太仓', '南通', '连云港', '东海', '长三角'
+        ],
+        'cities': ['上海', '宁波', '舟山', '连云港'],
+    },
+    'haixi': {
+        'name': '海峡西岸',
+        'level1': ['厦门', '厦门港', '福州', '福州港', '泉州', '台湾海峡', '福建', '海西'],
+        'cities': ['厦门', '泉州', '福州'],
+    },
+    'pearl': {
+        'name': '珠三角',
+        'level1': [
+            '广州', '广州港', '南沙', '深圳', '深圳港', '盐田', '蛇口', '珠江', '香港', '澳门',
+            '大湾区', '粤港澳', '湛江', '海口', '三亚', '海南', '南海'
+        ],
+        'cities': ['广州', '深圳', '湛江', '海口', '三亚'],
+    },
+}
+DEFAULT_REGION = 'bohai'
+
+def _resolve_region(region=None, location=None) -> str:
+    """确定早报区域：显式指定 > 天气位置推断 > 默认（环渤海）"""
+    if region and region in REGION_PROFILES:
+        return region
+    loc = (location or '').strip()
+    if loc:
+        loc = CITY_ZH_MAP.get(loc.lower(), loc)
+        for key, profile in REGION_PROFILES.items():
+            if any(city in loc for city in profile['cities']):
+                return key
+    return DEFAULT_REGION
+
+def _score_item(it: dict, region: str) -> int:
+    """按区域打分：区域核心词（L1），其次国内港口（L2），再优先顶级班轮公司（L3）"""
+    profile = REGION_PROFILES.get(region) or REGION_PROFILES[DEFAULT_REGION]
+    t = it.get('title') or ''
+    s = 0
+    for kw in profile['level1']:
+        if kw in t:
+            s += 10
+    for kw in PRIORITY_KEYWORDS_LEVEL2:
+        if kw in t:
+            s += 3
+    for kw in LINER_KEYWORDS:
+        if kw.lower() in t.lower():
+            s += 7
+    return s
+
+def rank_candidates(candidates: list, region: str, limit: int = 10) -> list:
+    """对候选池按区域重新排序，返回前 limit 条（稳定排序，同分保持抓取顺序）"""
+    return sorted(candidates, key=lambda it: _score_item(it, region), reverse=True)[:limit]
+
+async def _collect_candidates() -> list:
+    """抓取全部来源并翻译，返回去重后的候选池（最多40条）"""
+    # crawl4ai 会连带加载 Playwright，只在真正抓取时导入（worker 模式下 Web 进程从不加载）
+    from crawl4ai import AsyncWebCrawler
+
+    async def crawl(crawler, src):
+        with metric_timer('aizaobao_crawl_source_seconds', source=src['name']):
+            return await crawler.arun(url=src["url"], bypass_cache=True)
+
+    with metric_timer('aizaobao_news_stage_seconds', stage='fetch'):
         async with AsyncWebCrawler() as crawler:
-            tasks = [crawler.arun(url=src["url"], bypass_cache=True) for src in SHIPPING_SOURCES]
+            tasks = [crawl(crawler, src) for src in SHIPPING_SOURCES]
             results = await asyncio.gather(*tasks, return_exceptions=True)
 
-            collected = []  # 收集原始项用于打分排序
-            seen = set()
+    # 后备解析、RSS 与翻译都是同步网络请求，放到线程中执行，不阻塞共用的事件循环
+    return await asyncio.to_thread(_extract_candidates, results)
 
-            for src, res in zip(SHIPPING_SOURCES, results):
-                md = ''
-                if not isinstance(res, Exception) and res is not None:
-                    md = getattr(res, 'markdown', '') or ''
-                host = (urlparse(src['url']).hostname or '').lower()
-
-                per_source = _extract_headlines_for_source(md, src['url'], max_items=12) if md else []
-                if len(per_source) < 2:
-                    rss_titles = _rss_fallback_titles(host, max_items=12)
-                    if rss_titles:
-                        per_source = rss_titles
-                if not per_source:
-                    per_source = _fallback_extract_source(src['url'], max_items=12)
-
-                for item in per_source:
-                    title_raw = item['title'] if isinstance(item, dict) else str(item)
-                    url = item.get('url') if isinstance(item, dict) else ''
-                    title_cn = _translate_to_zh(title_raw)
-                    key = _normalize_headline(title_cn)
-                    if not key or key in seen:
-                        continue
-                    seen.add(key)
-                    collected.append({'title': title_cn, 'url': url, 'source': src['name']})
-                    # 上限收集 40 条用于排序
-                    if len(collected) >= 40:
-                        break
-                if len(collected) >= 40:
-                    break
+def _extract_candidates(results) -> list:
+    """从各来源的抓取结果中提取标题（必要时走后备解析）并翻译、去重"""
+    collected = []  # 收集原始项用于打分排序
+    seen = set()
+    extract_started = time.perf_counter()
 
-            if not collected:
-                date_str = datetime.now().strftime("%Y年%m月%d日")
-                placeholder = [
-                    "今日未获取到航运新闻，请稍后重试或点击刷新。",
-                    "如长期无结果，请检查服务器网络与Playwright浏览器安装。"
-                ]
-                formatted = f"{date_str} 航运早报\n\n" + "\n\n".join([f"{i+1}、{t}" for i, t in enumerate(placeholder)])
-                save_news_cache(formatted, placeholder, date_str)
-                clear_old_cache()
-                return formatted, placeholder, date_str
-
-            # 打分：优先天津及环渤海（L1），其次国内港口（L2），再优先顶级班轮公司（L3）
-            def score_item(it: dict) -> int:
-                t = it.get('title') or ''
-                s = 0
-                for kw in PRIORITY_KEYWORDS_LEVEL1:
-                    if kw in t:
-                        s += 10
-                for kw in PRIORITY_KEYWORDS_LEVEL2:
-                    if kw in t:
-                        s += 3
-                for kw in LINER_KEYWORDS:
-                    if kw.lower() in t.lower():
-                        s += 7
-                return s
-
-            collected.sort(key=score_item, reverse=True)
-            top_items = collected[:10]
-
-            formatted_news, news_items, date_str = format_news(top_items)
-
-            save_news_cache(formatted_news, news_items, date_str)
-            clear_old_cache()
-            
-            return formatted_news, news_items, date_str
-            
+    for src, res in zip(SHIPPING_SOURCES, results):
+        md = ''
+        if not isinstance(res, Exception) and res is not None:
+            md = getattr(res, 'markdown', '') or ''
+        else:
+            metric_inc('aizaobao_crawl_errors_total', source=src['name'])
+        host = (urlparse(src['url']).hostname or '').lower()
+
+        # 提取层级：页面 markdown -> RSS 兜底 -> requests + BeautifulSoup 后备解析
+        per_source = _extract_headlines_for_source(md, src['url'], max_items=12) if md else []
+        tier = 'markdown'
+        if len(per_source) < 2:
+            rss_titles = _rss_fallback_titles(host, max_items=12)
+            if rss_titles:
+                per_source, tier = rss_titles, 'rss'
+        if not per_source:
+            per_source, tier = _fallback_extract_source(src['url'], max_items=12), 'html'
+        metric_inc('aizaobao_crawl_items_total', len(per_source), source=src['name'], tier=tier)
+
+        for item in per_source:
+            title_raw = item['title'] if isinstance(item, dict) else str(item)
+            url = item.get('url') if isinstance(item, dict) else ''
+            title_cn = _translate_to_zh(title_raw)
+            key = _normalize_headline(title_cn)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            collected.append({'title': title_cn, 'url': url, 'source': src['name'], 'title_raw': title_raw})
+            # 上限收集 40 条用于排序
+            if len(collected) >= 40:
+                break
+        if len(collected) >= 40:
+            break
+    metric_observe('aizaobao_news_stage_seconds', time.perf_counter() - extract_started, stage='extract')
+    return collected
+
+async def build_edition(cache_date, slot):
+    """抓取一次并生成指定版次的全部区域早报，返回 {region: (formatted, items, date_str)}
+
+    一次抓取的候选池会为所有区域分别排序并写入各自缓存，
+    后续访问其他区域时直接命中缓存，无需再次抓取。
+    """
+    print(f"从网络获取最新航运新闻（{_edition_id(cache_date, slot)}）")
+    collected = await _collect_candidates()
+    # 排序、渲染、gzip 与写库在线程中执行
+    return await asyncio.to_thread(_save_edition, collected, cache_date, slot)
+
+def _save_edition(collected, cache_date, slot):
+    """用候选池生成并保存全部区域的早报，返回 {region: (formatted, items, date_str)}"""
+    date_str = _edition_date_str(cache_date, slot)
+    editions = {}
+
+    if not collected:
+        placeholder = [
+            "今日未获取到航运新闻，请稍后重试或点击刷新。",
+            "如长期无结果，请检查服务器网络与Playwright浏览器安装。"
+        ]
+        artifacts = render_edition(placeholder, date_str)
+        for key in REGION_PROFILES:
+            save_news_cache(
+                artifacts['html'], placeholder, date_str, region=key, cache_date=cache_date, slot=slot,
+                extra={'artifacts': artifacts}
+            )
+            editions[key] = (artifacts['html'], placeholder, date_str)
+        return editions
+
+    with metric_timer('aizaobao_news_stage_seconds', stage='save'):
+        save_candidate_pool(collected, cache_date, slot)
+
+        # 同一候选池按区域分别排序，生成各区域版本
+        for key in REGION_PROFILES:
+            artifacts = render_edition(rank_candidates(collected, key), date_str)
+            formatted_news, news_items = artifacts['html'], [it['title'] for it in artifacts['items']]
+            save_news_cache(
+                formatted_news, news_items, date_str, region=key, cache_date=cache_date, slot=slot,
+                extra={'artifacts': artifacts}
+            )
+            editions[key] = (formatted_news, news_items, date_str)
+    return editions
+
+# 常驻事件循环：所有抓取协程在同一个后台线程的循环中运行，请求线程只等待结果
+NEWS_BUILD_TIMEOUT = int(os.getenv('NEWS_BUILD_TIMEOUT', '280'))
+_async_loop = None
+_async_loop_pid = None
+_async_loop_lock = threading.Lock()
+# 正在构建的版次（仅在事件循环线程中访问），同一版次的并发请求共用一次抓取
+_build_tasks = {}
+
+def get_async_loop():
+    """返回本进程的常驻事件循环（首次使用或 fork 后在新线程中启动）"""
+    global _async_loop, _async_loop_pid
+    with _async_loop_lock:
+        if _async_loop is None or _async_loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='asyncio-loop', daemon=True).start()
+            _async_loop, _async_loop_pid = loop, os.getpid()
+        return _async_loop
+
+def run_async(coro, timeout=None):
+    """在常驻事件循环中运行协程并等待结果；超时抛出 FutureTimeout，协程继续在后台完成"""
+    return asyncio.run_coroutine_threadsafe(coro, get_async_loop()).result(timeout)
+
+async def build_edition_once(cache_date, slot):
+    """构建版次（单飞）：同一版次正在构建时等待已有任务，不重复抓取"""
+    key = (cache_date, slot)
+    task = _build_tasks.get(key)
+    if task is None or task.done():
+        task = asyncio.ensure_future(build_edition(cache_date, slot))
+        _build_tasks[key] = task
+        task.add_done_callback(lambda t: _build_tasks.pop(key, None) if _build_tasks.get(key) is t else None)
+    else:
+        print(f"版次 {_edition_id(cache_date, slot)} 正在构建，等待结果")
+    # shield：某个等待者超时取消时不影响构建本身
+    return await asyncio.shield(task)
+
+async def get_news_content(region=None, force=False):
+    """获取当前版次的航运新闻内容（带缓存机制，多源聚合）"""
+    region = _resolve_region(region)
+    cache_date, slot = get_current_edition()
+    # 先尝试从缓存加载
+    # 本协程运行在共用的事件循环线程中，SQLite 读写与 gzip 解压均放到线程中执行
+    if not force:
+        with metric_timer('aizaobao_news_stage_seconds', stage='cache'):
+            cached_news, cached_items, cached_date = await asyncio.to_thread(load_news_cache, region)
+        if cached_news is not None:
+            print("使用缓存的新闻内容")
+            return cached_news, cached_items, cached_date
+        # 当前版次候选池已存在（如新增区域），直接重排生成，无需再次抓取
+        if await asyncio.to_thread(load_candidate_pool, cache_date, slot):
+            print("使用当前版次候选池重新排序生成")
+            with metric_timer('aizaobao_news_stage_seconds', stage='regenerate'):
+                return await asyncio.to_thread(regenerate_edition, cache_date, region, save=True, slot=slot)
+    
+    try:
+        if not crawl_locally():
+            # 交给 worker 进程抓取，等待任务结束后读取版次库
+            job_id = await asyncio.to_thread(
+                enqueue_job, 'build_edition', {'cache_date': cache_date, 'slot': slot},
+                dedupe_key=f"build:{_edition_id(cache_date, slot)}"
+            )
+            with metric_timer('aizaobao_news_stage_seconds', stage='queue_wait'):
+                job = await asyncio.to_thread(wait_for_job, job_id, NEWS_BUILD_TIMEOUT)
+            if not job or job['status'] != 'done':
+                return None, None, None
+            cache_data = await asyncio.to_thread(read_news_cache, region, cache_date, slot)
+            if not cache_data:
+                return None, None, None
+            return cache_data['formatted_news'], cache_data['news_items'], cache_data['date_str']
+        editions = await build_edition_once(cache_date, slot)
+        return editions.get(region, (None, None, None))
     except Exception as e:
         print(f"获取航运新闻失败: {e}")
         return None, None, None
 
+# 后台触发的版次构建（区域, 日期, 版次），同一版次在本进程内只触发一次
+_background_builds = set()
+_background_builds_lock = threading.Lock()
+
+def start_edition_build(region, cache_date, slot):
+    """在常驻事件循环中后台生成当前版次（不等待结果）；抓取本身单飞，worker 模式下只入队一次"""
+    key = (region, cache_date, slot)
+    with _background_builds_lock:
+        if key in _background_builds:
+            return
+        _background_builds.add(key)
+
+    def done(future):
+        with _background_builds_lock:
+            _background_builds.discard(key)
+        if not future.cancelled() and future.exception():
+            print(f"后台构建版次失败 {_edition_id(cache_date, slot)}: {future.exception()}")
+
+    asyncio.run_coroutine_threadsafe(get_news_content(region), get_async_loop()).add_done_callback(done)
+
 def create_audio_folder():
     """创建音频文件夹"""
     audio_folder = "static/audio"
@@ -734,11 +1643,43 @@ def create_audio_folder():
         os.makedirs(audio_folder)
     return audio_folder
 
-def generate_audio(text, config):
-    """调用Minimax API生成音频"""
-    if not config.get('group_id') or not config.get('api_key'):
-        return None, "请先配置Minimax API信息", None
-    
+# 影响合成结果的语音参数，与规范化文本一起组成音频缓存键
+TTS_CACHE_FIELDS = ('model', 'voice_id', 'speed', 'pitch', 'vol', 'emotion', 'sample_rate', 'bitrate', 'format')
+
+# 正在合成中的音频（文件路径 -> 等待对象），相同请求只合成一次
+_tts_inflight = {}
+_tts_inflight_lock = threading.Lock()
+
+def normalize_tts_text(text):
+    """规范化朗读文本：去除换行并合并多余空白"""
+    return re.sub(r'[ \t\u3000]+', ' ', remove_newlines(text or '')).strip()
+
+# 语音参数在哈希前统一类型：界面保存的 1.0 经 JSON 往返后变成 1，不能因此得到不同的缓存键
+TTS_FIELD_TYPES = {'speed': float, 'vol': float, 'pitch': int, 'sample_rate': int, 'bitrate': int}
+
+def _normalize_tts_setting(field, value):
+    cast = TTS_FIELD_TYPES.get(field, str)
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+def tts_cache_key(text, config):
+    """音频缓存键：规范化文本 + 语音参数（统一类型后）的哈希"""
+    settings = {field: _normalize_tts_setting(field, config.get(field, DEFAULT_CONFIG[field])) for field in TTS_CACHE_FIELDS}
+    raw = json.dumps([normalize_tts_text(text), settings], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+def get_tts_file_path(key, config):
+    """缓存音频的文件名与路径：static/audio/tts_<hash>.<format>"""
+    filename = f"tts_{key}.{config.get('format', 'mp3')}"
+    return filename, os.path.join(create_audio_folder(), filename)
+
+# Minimax 请求超时（连接秒数, 读取秒数），避免一次慢调用占住 worker
+TTS_TIMEOUT = (10, int(os.getenv('TTS_TIMEOUT', '120')))
+
+def _tts_request_args(text, config, stream=False):
+    """Minimax 合成请求的 URL、请求头与请求体"""
     url = f"https://api.minimax.chat/v1/t2a_v2?GroupId={config['group_id']}"
     headers = {
         "Authorization": f"Bearer {config['api_key']}",
@@ -769,55 +1710,679 @@ def generate_audio(text, config):
         },
         "language_boost": "auto"
     }
+    if stream:
+        payload["stream"] = True
+    return url, headers, payload
 
+# 响应按块读取并增量解析：十六进制音频分块解码后直接写入文件，内存占用与音频长度无关
+TTS_READ_CHUNK = 64 * 1024
+_AUDIO_FIELD_RE = re.compile(rb'"audio"\s*:\s*"')
+
+def _write_audio_from_json(chunks, out):
+    """从 JSON 响应块中流式提取 data.audio 并解码写入 out
+
+    返回 (写入字节数, 去掉音频字段后的其余 JSON 字典)。
+    """
+    meta, buf, written = [], b'', 0
+    state = 'scan'
+    for chunk in chunks:
+        buf += chunk
+        if state == 'scan':
+            m = _AUDIO_FIELD_RE.search(buf)
+            if not m:
+                # 保留末尾几个字节，避免字段名被切在两块之间
+                meta.append(buf[:-16])
+                buf = buf[-16:]
+                continue
+            meta.append(buf[:m.start()] + b'"audio":null')
+            buf = buf[m.end():]
+            state = 'hex'
+        if state == 'hex':
+            end = buf.find(b'"')
+            hex_part = buf if end < 0 else buf[:end]
+            usable = len(hex_part) - len(hex_part) % 2
+            if usable:
+                out.write(binascii.unhexlify(hex_part[:usable]))
+                written += usable // 2
+            if end < 0:
+                buf = hex_part[usable:]
+                continue
+            if usable != len(hex_part):
+                raise ValueError("音频十六进制长度不完整")
+            buf = buf[end + 1:]
+            state = 'tail'
+        if state == 'tail':
+            meta.append(buf)
+            buf = b''
+    meta.append(buf)
+    return written, json.loads(b''.join(meta))
+
+def request_tts(text, config, out):
+    """调用Minimax API合成音频并写入文件对象 out，返回 error（成功为 None）"""
+    url, headers, payload = _tts_request_args(text, config)
+    started = time.perf_counter()
+    error = _request_tts(url, headers, payload, out)
+    metric_observe('aizaobao_tts_request_seconds', time.perf_counter() - started, mode='full')
+    if error:
+        metric_inc('aizaobao_tts_errors_total', mode='full')
+    return error
+
+def _request_tts(url, headers, payload, out):
     try:
-        response = requests.post(url, headers=headers, json=payload)
+        with requests.post(url, headers=headers, json=payload, stream=True, timeout=TTS_TIMEOUT) as response:
+            if response.status_code != 200:
+                return f"HTTP请求失败: {response.status_code}"
+            try:
+                written, response_data = _write_audio_from_json(response.iter_content(TTS_READ_CHUNK), out)
+            except Exception as e:
+                return f"音频数据解析失败: {str(e)}"
+        metric_inc('aizaobao_tts_bytes_total', written, mode='full')
         
-        if response.status_code == 200:
-            response_data = response.json()
+        if response_data.get("base_resp", {}).get("status_code") != 0:
+            error_msg = response_data.get("base_resp", {}).get("status_msg", "未知错误")
+            return f"API调用失败: {error_msg}"
+        if not written:
+            return "API返回的音频数据为空"
+        return None
             
-            if response_data.get("base_resp", {}).get("status_code") == 0:
-                audio_data = response_data.get("data", {}).get("audio")
-                
-                if audio_data:
-                    try:
-                        audio_bytes = bytes.fromhex(audio_data)
-                        
-                        # 保存音频文件到静态目录，以便分享
-                        audio_folder = create_audio_folder()
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        filename = f"shipping_news_{timestamp}.mp3"
-                        file_path = os.path.join(audio_folder, filename)
-                        
-                        with open(file_path, 'wb') as f:
-                            f.write(audio_bytes)
-                        
-                        # 生成分享URL
-                        share_url = f"/aizaobao/static/audio/{filename}"
-                        
-                        return audio_bytes, None, share_url
-                    except Exception as e:
-                        return None, f"音频数据解析失败: {str(e)}", None
-                else:
-                    return None, "API返回的音频数据为空", None
-            else:
-                error_msg = response_data.get("base_resp", {}).get("status_msg", "未知错误")
-                return None, f"API调用失败: {error_msg}", None
+    except Exception as e:
+        return f"请求异常: {str(e)}"
+
+def _cached_synthesis(file_path, produce):
+    """按文件路径缓存合成结果：命中直接返回；未命中时同一路径只由一个线程调用 produce(out)
+
+    produce 向临时文件写入音频并返回 error（成功为 None），完成后改名，其他请求不会读到写了一半的音频。
+    返回 (file_path, error)。
+    """
+    with _tts_inflight_lock:
+        waiter = _tts_inflight.get(file_path)
+        leader = waiter is None and not os.path.exists(file_path)
+        if leader:
+            waiter = {'event': threading.Event(), 'result': None}
+            _tts_inflight[file_path] = waiter
+    
+    if waiter is None:
+        # 命中缓存
+        touch_access(file_path)
+        return file_path, None
+    
+    if not leader:
+        waiter['event'].wait()
+        return waiter['result']
+    
+    result = (None, "音频生成失败")
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with open(tmp_path, 'wb') as f:
+            error = produce(f)
+        if error:
+            result = (None, error)
         else:
-            return None, f"HTTP请求失败: {response.status_code}", None
-            
+            os.replace(tmp_path, file_path)
+            result = (file_path, None)
     except Exception as e:
-        return None, f"请求异常: {str(e)}", None
+        result = (None, f"音频保存失败: {str(e)}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with _tts_inflight_lock:
+            _tts_inflight.pop(file_path, None)
+        waiter['result'] = result
+        waiter['event'].set()
+    return result
+
+# 分段合成：开头、每条的序号（“第N条，”）与每条新闻标题各为一段，分段缓存后拼接为完整 MP3
+# 序号单独成段：排序变化导致条目换位时，标题分段仍能命中缓存，序号分段在各版次间通用
+TTS_SEGMENT_FOLDER = os.path.join('cache', 'tts_segments')
+TTS_SEGMENT_MAX_CHARS = int(os.getenv('TTS_SEGMENT_MAX_CHARS', '300'))
+TTS_PARALLELISM = max(int(os.getenv('TTS_PARALLELISM', '4')), 1)
+
+def split_tts_segments(text):
+    """按“第N条，”切分朗读稿（序号与标题分开）；没有条目标记时按句号切成不超过 TTS_SEGMENT_MAX_CHARS 的段"""
+    text = normalize_tts_text(text)
+    parts = [seg.strip() for seg in re.split(r'(?=第\d+条，)', text) if seg.strip()]
+    if len(parts) > 1:
+        segments = []
+        for part in parts:
+            m = re.match(r'^(第\d+条，)(.+)$', part)
+            segments.extend([m.group(1), m.group(2).strip()] if m else [part])
+        return segments
+    segments, current = [], ''
+    for sentence in re.split(r'(?<=[。！？!?])', text):
+        if current and len(current) + len(sentence) > TTS_SEGMENT_MAX_CHARS:
+            segments.append(current.strip())
+            current = ''
+        current += sentence
+    if current.strip():
+        segments.append(current.strip())
+    return segments
+
+def _id3_size(header):
+    """MP3 开头 ID3v2 标签的总长度（无标签为 0），拼接时只保留第一段的标签"""
+    if header[:3] != b'ID3' or len(header) < 10:
+        return 0
+    size = 0
+    for b in header[6:10]:
+        size = (size << 7) | (b & 0x7f)
+    return 10 + size + (10 if header[5] & 0x10 else 0)
+
+def synthesize_segment(segment, config):
+    """合成单个分段（按内容哈希缓存在 cache/tts_segments），返回 (file_path, error)"""
+    os.makedirs(TTS_SEGMENT_FOLDER, exist_ok=True)
+    file_path = os.path.join(TTS_SEGMENT_FOLDER, f"seg_{tts_cache_key(segment, config)}.{config.get('format', 'mp3')}")
+    return _cached_synthesis(file_path, lambda out: request_tts(segment, config, out))
+
+def synthesize_segmented(text, config, out, progress=None):
+    """分段并行合成并拼接写入 out，返回 error（成功为 None）；只有变化的分段会调用 API
+
+    progress(done, total) 在每段完成时回调。
+    """
+    segments = split_tts_segments(text)
+    # 仅 MP3 可以直接按帧拼接，其他格式整段合成
+    if len(segments) <= 1 or config.get('format', 'mp3') != 'mp3':
+        return request_tts(normalize_tts_text(text), config, out)
+    done = [0]
+    done_lock = threading.Lock()
+
+    def run(seg):
+        result = synthesize_segment(seg, config)
+        if progress:
+            with done_lock:
+                done[0] += 1
+                progress(done[0], len(segments))
+        return result
+
+    with metric_timer('aizaobao_tts_stage_seconds', stage='segments'):
+        with ThreadPoolExecutor(max_workers=min(TTS_PARALLELISM, len(segments))) as pool:
+            results = list(pool.map(run, segments))
+    for seg_path, error in results:
+        if not seg_path:
+            return error
+    # 逐段按块复制，不把整段音频读入内存
+    with metric_timer('aizaobao_tts_stage_seconds', stage='concat'):
+        for i, (seg_path, _) in enumerate(results):
+            with open(seg_path, 'rb') as f:
+                if i:
+                    f.seek(_id3_size(f.read(10)))
+                shutil.copyfileobj(f, out, TTS_READ_CHUNK)
+    return None
+
+def generate_audio(text, config, progress=None):
+    """生成音频（按文本与语音参数缓存，命中时直接返回已有文件）
+
+    返回 (file_path, error, share_url)；未命中时分段并行合成，并发的相同请求只合成一次。
+    """
+    if not config.get('group_id') or not config.get('api_key'):
+        return None, "请先配置Minimax API信息", None
+    
+    key = tts_cache_key(text, config)
+    filename, file_path = get_tts_file_path(key, config)
+    with metric_timer('aizaobao_tts_stage_seconds', stage='total'):
+        file_path, error = _cached_synthesis(file_path, lambda out: synthesize_segmented(text, config, out, progress))
+    if not file_path:
+        return None, error, None
+    # 生成分享URL
+    share_url = f"/aizaobao/static/audio/{filename}"
+    return file_path, None, share_url
+
+# 流式合成：生成接口登记任务，播放器 GET 流地址时才调用 Minimax
+# 任务在进程内存中，仅用于 inline 模式（需单 worker 或会话粘滞）；worker 模式改走任务队列
+TTS_STREAM_TTL = 600
+_tts_stream_jobs = {}
+
+def register_tts_stream(text, config):
+    """登记流式合成任务，返回 (key, share_url, cached)；已缓存时无需走流式"""
+    key = tts_cache_key(text, config)
+    filename, file_path = get_tts_file_path(key, config)
+    share_url = f"/aizaobao/static/audio/{filename}"
+    if os.path.exists(file_path):
+        return key, share_url, True
+    now = time.time()
+    with _tts_inflight_lock:
+        for stale in [k for k, job in _tts_stream_jobs.items() if now - job['created'] > TTS_STREAM_TTL]:
+            _tts_stream_jobs.pop(stale, None)
+        _tts_stream_jobs[key] = {'text': normalize_tts_text(text), 'config': dict(config), 'created': now}
+    return key, share_url, False
+
+# 流式接口最后的 status=2 事件以十六进制汇总整段音频，不能整行读入再解析：
+# 未结束的事件一旦出现 status=2 标记，或超过单个分块事件的上限（只可能是汇总事件），即停止读取
+TTS_STREAM_EVENT_MAX = 512 * 1024
+_TTS_FINAL_EVENT_RE = re.compile(rb'"status"\s*:\s*2\b')
+
+def _tts_stream_event(line):
+    """解析一行 SSE，返回音频字节（无音频为 b''）；status=2 事件返回 None"""
+    line = line.strip()
+    if not line.startswith(b'data:'):
+        return b''
+    event = json.loads(line[5:])
+    base_resp = event.get('base_resp') or {}
+    if base_resp.get('status_code', 0) != 0:
+        raise RuntimeError(f"API调用失败: {base_resp.get('status_msg', '未知错误')}")
+    data = event.get('data') or {}
+    if data.get('status') == 2:
+        return None
+    return bytes.fromhex(data['audio']) if data.get('audio') else b''
+
+def iter_tts_stream(text, config):
+    """调用 Minimax 流式接口，逐块产出音频字节（不读取最后汇总整段音频的 status=2 事件）"""
+    url, headers, payload = _tts_request_args(text, config, stream=True)
+    started = time.perf_counter()
+    try:
+        with requests.post(url, headers=headers, json=payload, stream=True, timeout=TTS_TIMEOUT) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP请求失败: {response.status_code}")
+            buf = b''
+            for data in response.iter_content(TTS_READ_CHUNK):
+                buf += data
+                *lines, buf = buf.split(b'\n')
+                for line in lines:
+                    chunk = _tts_stream_event(line)
+                    if chunk is None:
+                        return
+                    if chunk:
+                        metric_inc('aizaobao_tts_bytes_total', len(chunk), mode='stream')
+                        yield chunk
+                if _TTS_FINAL_EVENT_RE.search(buf) or len(buf) > TTS_STREAM_EVENT_MAX:
+                    return
+            chunk = _tts_stream_event(buf)
+            if chunk:
+                metric_inc('aizaobao_tts_bytes_total', len(chunk), mode='stream')
+                yield chunk
+    except Exception:
+        metric_inc('aizaobao_tts_errors_total', mode='stream')
+        raise
+    finally:
+        # 流式耗时为整段转发时长（含客户端读取）
+        metric_observe('aizaobao_tts_request_seconds', time.perf_counter() - started, mode='stream')
+
+def stream_tts_to_cache(key):
+    """边转发边写入音频缓存；返回字节生成器，找不到任务时返回 None"""
+    with _tts_inflight_lock:
+        job = _tts_stream_jobs.get(key)
+    if not job:
+        return None
+    return _relay_tts_stream(key, job['text'], job['config'])
+
+def _relay_tts_stream(key, text, config):
+    """流式转发的生成器；同一音频正在生成时，等待其完成后整段返回"""
+    filename, file_path = get_tts_file_path(key, config)
+    with _tts_inflight_lock:
+        waiter = _tts_inflight.get(file_path)
+        leader = waiter is None and not os.path.exists(file_path)
+        if leader:
+            waiter = {'event': threading.Event(), 'result': None}
+            _tts_inflight[file_path] = waiter
+            _tts_stream_jobs.pop(key, None)
+
+    if not leader:
+        done_path, error = _cached_synthesis(file_path, lambda out: request_tts(text, config, out))
+        if done_path:
+            with open(done_path, 'rb') as f:
+                while True:
+                    chunk = f.read(TTS_READ_CHUNK)
+                    if not chunk:
+                        break
+                    yield chunk
+        return
+
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.part"
+    result = (None, "流式合成中断")
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter_tts_stream(text, config):
+                f.write(chunk)
+                yield chunk
+        os.replace(tmp_path, file_path)
+        result = (file_path, None)
+    except Exception as e:
+        print(f"流式合成失败: {e}")
+        result = (None, f"流式合成失败: {str(e)}")
+    finally:
+        # 客户端中途断开时同样清理临时文件并唤醒等待者
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with _tts_inflight_lock:
+            _tts_inflight.pop(file_path, None)
+        waiter['result'] = result
+        waiter['event'].set()
+
+# 语音合成后台任务队列：提交后立即返回任务ID，由后台线程合成，失败按次数重试
+# inline 模式下任务状态只保存在本进程内存中，查询必须落到同一进程，需单 worker（WORKERS=1）或会话粘滞；
+# 多 worker 部署请使用 CRAWL_MODE=worker，任务改存版次库 jobs 表
+TTS_WORKERS = max(int(os.getenv('TTS_WORKERS', '2')), 1)
+TTS_MAX_RETRIES = int(os.getenv('TTS_MAX_RETRIES', '2'))
+TTS_JOB_TTL = 3600
+_tts_queue = queue.Queue()
+_tts_jobs = {}
+_tts_jobs_lock = threading.Lock()
+_tts_workers_started = False
+
+def _tts_job_view(job):
+    """任务状态（对外返回的字段）"""
+    view = {k: job[k] for k in ('job_id', 'status', 'progress', 'attempts', 'error', 'audio_id')}
+    if job['status'] == 'done':
+        view['audio_url'] = f"/aizaobao/api/audio/{job['audio_id']}"
+        view['download_url'] = f"/aizaobao/api/audio/{job['audio_id']}?download=1"
+        view['share_url'] = job['share_url']
+    return view
+
+def _queued_tts_job_view(job):
+    """队列中语音任务的状态，字段与进程内任务一致"""
+    result = job['result'] or {}
+    return _tts_job_view({
+        'job_id': f"q{job['id']}", 'status': job['status'], 'attempts': job['attempts'],
+        'error': job['error'], 'audio_id': job['payload']['audio_id'],
+        'progress': job['progress'] or {'done': 0, 'total': len(split_tts_segments(job['payload']['text']))},
+        'share_url': result.get('share_url')
+    })
+
+def submit_tts_job(text, config, on_done=None):
+    """提交语音合成任务，返回任务状态；相同文本与语音设置的未完成任务直接复用"""
+    audio_id = tts_cache_key(text, config)
+    if not crawl_locally():
+        # worker 模式：写入任务队列，由 worker.py 合成（on_done 仅用于定时任务，在 worker 进程内执行）
+        job_id = enqueue_job('tts', {'text': text, 'config': config, 'audio_id': audio_id}, dedupe_key=f"tts:{audio_id}")
+        return _queued_tts_job_view(get_job(job_id))
+    now = time.time()
+    with _tts_jobs_lock:
+        for job_id in [k for k, job in _tts_jobs.items()
+                       if job['status'] in ('done', 'failed') and now - job['updated'] > TTS_JOB_TTL]:
+            _tts_jobs.pop(job_id, None)
+        for job in _tts_jobs.values():
+            if job['audio_id'] == audio_id and job['status'] in ('queued', 'running'):
+                if on_done:
+                    job['callbacks'].append(on_done)
+                return _tts_job_view(job)
+        job = {
+            'job_id': secrets.token_hex(8), 'audio_id': audio_id, 'status': 'queued',
+            'progress': {'done': 0, 'total': len(split_tts_segments(text))},
+            'attempts': 0, 'error': None, 'share_url': None,
+            'text': text, 'config': dict(config), 'callbacks': [on_done] if on_done else [],
+            'updated': now
+        }
+        _tts_jobs[job['job_id']] = job
+    _start_tts_workers()
+    _tts_queue.put(job['job_id'])
+    return _tts_job_view(job)
+
+def get_tts_job(job_id):
+    """查询任务状态，不存在（或已过期）时返回 None"""
+    if job_id.startswith('q') and job_id[1:].isdigit():
+        job = get_job(int(job_id[1:]))
+        return _queued_tts_job_view(job) if job and job['kind'] == 'tts' else None
+    with _tts_jobs_lock:
+        job = _tts_jobs.get(job_id)
+        return _tts_job_view(job) if job else None
+
+def _run_tts_job(job, on_update=None):
+    """执行任务：失败时退避重试，最多 TTS_MAX_RETRIES 次；on_update(job) 在进度变化时回调"""
+    def progress(done, total):
+        job['progress'] = {'done': done, 'total': total}
+        job['updated'] = time.time()
+        if on_update:
+            on_update(job)
+
+    job['status'] = 'running'
+    for attempt in range(TTS_MAX_RETRIES + 1):
+        job['attempts'] = attempt + 1
+        file_path, error, share_url = generate_audio(job['text'], job['config'], progress)
+        if file_path:
+            job.update({'status': 'done', 'error': None, 'share_url': share_url})
+            job['progress']['done'] = job['progress']['total']
+            break
+        job['error'] = error
+        # 凭据缺失等配置错误重试无意义
+        if error == "请先配置Minimax API信息" or attempt == TTS_MAX_RETRIES:
+            job['status'] = 'failed'
+            break
+        time.sleep(2 ** attempt)
+    job['updated'] = time.time()
+    for callback in job['callbacks']:
+        try:
+            callback(job)
+        except Exception as e:
+            print(f"语音任务回调失败: {e}")
+
+def _tts_worker_loop():
+    while True:
+        job_id = _tts_queue.get()
+        with _tts_jobs_lock:
+            job = _tts_jobs.get(job_id)
+        if job:
+            try:
+                _run_tts_job(job)
+            except Exception as e:
+                job.update({'status': 'failed', 'error': f"生成音频异常: {str(e)}", 'updated': time.time()})
+        _tts_queue.task_done()
+
+def _start_tts_workers():
+    """首次提交任务时启动后台合成线程"""
+    global _tts_workers_started
+    with _tts_jobs_lock:
+        if _tts_workers_started:
+            return
+        _tts_workers_started = True
+    for i in range(TTS_WORKERS):
+        threading.Thread(target=_tts_worker_loop, name=f'tts-worker-{i}', daemon=True).start()
+
+def get_env_tts_config():
+    """服务端默认语音配置（用于定时任务），Minimax 凭据来自环境变量"""
+    config = DEFAULT_CONFIG.copy()
+    config['group_id'] = os.getenv('MINIMAX_GROUP_ID', '')
+    config['api_key'] = os.getenv('MINIMAX_API_KEY', '')
+    return config
+
+def generate_edition_audio(cache_date, slot):
+    """为指定版次的各区域早报提交默认音色的语音任务，完成后把音频地址写回缓存"""
+    config = get_env_tts_config()
+    if not config['group_id'] or not config['api_key']:
+        print("未配置 MINIMAX_GROUP_ID/MINIMAX_API_KEY，跳过版次音频生成")
+        return
+    for key in REGION_PROFILES:
+        cache_data = read_news_cache(key, cache_date, slot)
+        if not cache_data or cache_data.get('audio_url'):
+            continue
+        tts_text = get_edition_artifacts(cache_data)['tts']
+
+        def on_done(job, key=key):
+            if job['status'] != 'done':
+                print(f"版次音频生成失败 {_edition_id(cache_date, slot)}_{key}: {job['error']}")
+                return
+            # 重新读取，避免覆盖期间刷新的内容
+            latest = read_news_cache(key, cache_date, slot)
+            if not latest or get_edition_artifacts(latest)['tts'] != tts_text:
+                return
+            save_news_cache(
+                latest['formatted_news'], latest['news_items'], latest['date_str'],
+                region=key, cache_date=cache_date, slot=slot,
+                extra={'artifacts': get_edition_artifacts(latest), 'audio_url': job['share_url']}
+            )
+
+        submit_tts_job(tts_text, config, on_done=on_done)
+
+def _run_edition_build(cache_date, slot):
+    """构建指定版次（抓取 + 各区域排序 + 音频）"""
+    editions = run_async(build_edition_once(cache_date, slot))
+    if editions:
+        generate_edition_audio(cache_date, slot)
+
+def _scheduler_loop():
+    """定时任务：启动时补齐当前版次，之后在每个版次时间点构建新版次"""
+    while True:
+        try:
+            cache_date, slot = get_current_edition()
+            if read_news_cache(DEFAULT_REGION, cache_date, slot) is None:
+                print(f"定时任务：构建版次 {_edition_id(cache_date, slot)}")
+                _run_edition_build(cache_date, slot)
+        except Exception as e:
+            print(f"定时任务执行失败: {e}")
+        # 每分钟检查一次是否进入新版次
+        time.sleep(60)
+
+# 后台清理任务：按类型配置保留天数与总大小上限（MB），超限时按策略淘汰
+# policy: oldest 按修改时间淘汰；lru 按最近访问时间淘汰（音频被访问时会刷新 atime）
+JANITOR_INTERVAL = int(os.getenv('JANITOR_INTERVAL', '3600'))
+JANITOR_QUOTAS = {
+    'cache': {
+        'folder': 'cache',
+        'prefixes': ('news_', 'pool_'),
+        'suffixes': ('.json', '.json.gz'),
+        'max_age_days': HISTORY_RETENTION_DAYS,
+        'max_mb': float(os.getenv('CACHE_MAX_MB', '200')),
+        'policy': 'oldest',
+    },
+    'tts_segments': {
+        'folder': os.path.join('cache', 'tts_segments'),
+        'prefixes': ('seg_',),
+        'suffixes': ('.mp3', '.part'),
+        'max_age_days': int(os.getenv('AUDIO_MAX_AGE_DAYS', '7')),
+        'max_mb': float(os.getenv('TTS_SEGMENTS_MAX_MB', '200')),
+        'policy': 'lru',
+    },
+    'audio': {
+        'folder': os.path.join('static', 'audio'),
+        'prefixes': ('',),
+        'suffixes': ('.mp3', '.part'),
+        'max_age_days': int(os.getenv('AUDIO_MAX_AGE_DAYS', '7')),
+        'max_mb': float(os.getenv('AUDIO_MAX_MB', '500')),
+        'policy': 'lru',
+    },
+}
+JANITOR_STATS_FILE = os.path.join('cache', 'janitor_stats.json')
+
+def touch_access(file_path):
+    """刷新文件访问时间（供 LRU 淘汰参考），修改时间保持不变"""
+    try:
+        st = os.stat(file_path)
+        # 一小时内已刷新过则跳过，避免频繁写元数据
+        if time.time() - st.st_atime > 3600:
+            os.utime(file_path, (time.time(), st.st_mtime))
+    except OSError:
+        pass
+
+def _protected_audio_files() -> set:
+    """版次库中仍被引用的音频（保留期内的当前与历史版次）不参与淘汰，避免历史详情返回失效的音频地址"""
+    rows = get_edition_db().execute(
+        "SELECT DISTINCT audio_url FROM editions WHERE audio_url IS NOT NULL AND audio_url != ''"
+    )
+    return {row['audio_url'].rsplit('/', 1)[-1] for row in rows}
+
+def _janitor_sweep(kind, quota, protected=()):
+    """按配额清理单个目录，返回本次统计"""
+    stats = {'scanned': 0, 'deleted': 0, 'freed_bytes': 0, 'total_bytes': 0}
+    folder = quota['folder']
+    if not os.path.isdir(folder):
+        return stats
+    now = time.time()
+    files = []
+    for entry in os.scandir(folder):
+        if not entry.is_file() or entry.name in protected:
+            continue
+        if not entry.name.startswith(quota['prefixes']) or not entry.name.endswith(quota['suffixes']):
+            continue
+        st = entry.stat()
+        last_used = max(st.st_atime, st.st_mtime) if quota['policy'] == 'lru' else st.st_mtime
+        files.append((last_used, st.st_size, entry.path))
+    stats['scanned'] = len(files)
+
+    def remove(path, size):
+        try:
+            os.remove(path)
+            stats['deleted'] += 1
+            stats['freed_bytes'] += size
+            return True
+        except OSError as e:
+            print(f"清理文件失败 {path}: {e}")
+            return False
+
+    # 1) 超过保留天数
+    kept = []
+    max_age = quota['max_age_days'] * 86400
+    for last_used, size, path in files:
+        if max_age > 0 and now - last_used > max_age:
+            if remove(path, size):
+                continue
+        kept.append((last_used, size, path))
+
+    # 2) 超过总大小上限时，从最久未使用的开始淘汰
+    total = sum(size for _, size, _ in kept)
+    limit = quota['max_mb'] * 1024 * 1024
+    if limit > 0 and total > limit:
+        for last_used, size, path in sorted(kept):
+            if total <= limit:
+                break
+            if remove(path, size):
+                total -= size
+    stats['total_bytes'] = total
+    return stats
+
+def run_janitor():
+    """执行一次清理：版次库保留期 + 各目录配额，统计写入 cache/janitor_stats.json"""
+    started = time.time()
+    report = {'started_at': datetime.now().isoformat(), 'types': {}}
+    report['db_rows_deleted'] = clear_old_cache()
+    report['jobs_deleted'] = purge_old_jobs()
+    protected = _protected_audio_files()
+    for kind, quota in JANITOR_QUOTAS.items():
+        try:
+            report['types'][kind] = _janitor_sweep(kind, quota, protected if kind == 'audio' else ())
+        except Exception as e:
+            report['types'][kind] = {'error': str(e)}
+    report['duration_ms'] = round((time.time() - started) * 1000, 1)
+    try:
+        with open(JANITOR_STATS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"写入清理统计失败: {e}")
+    summary = ', '.join(
+        f"{k}: 删除{v.get('deleted', 0)}个/释放{v.get('freed_bytes', 0) // 1024}KB"
+        for k, v in report['types'].items()
+    )
+    print(f"清理任务完成（{report['duration_ms']}ms）{summary}")
+    return report
+
+def _janitor_loop():
+    """后台清理循环，不占用请求路径"""
+    while True:
+        try:
+            run_janitor()
+        except Exception as e:
+            print(f"清理任务执行失败: {e}")
+        time.sleep(JANITOR_INTERVAL)
+
+_scheduler_started = False
+_scheduler_lock_file = None
+
+def start_background_jobs():
+    """启动后台定时任务（多进程部署时通过文件锁保证只有一个进程运行）"""
+    global _scheduler_started, _scheduler_lock_file
+    if _scheduler_started or os.getenv('SCHEDULER_ENABLED', '1') != '1':
+        return False
+    # worker 模式下定时任务由 worker.py 进程运行
+    if not crawl_locally():
+        return False
+    try:
+        import fcntl
+        _scheduler_lock_file = open(os.path.join(create_cache_folder(), '.scheduler.lock'), 'w')
+        fcntl.flock(_scheduler_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except ImportError:
+        # Windows 本地开发无 fcntl，单进程直接运行
+        pass
+    except OSError:
+        print("定时任务已在其他进程中运行")
+        return False
+    _scheduler_started = True
+    threading.Thread(target=_scheduler_loop, name='edition-scheduler', daemon=True).start()
+    threading.Thread(target=_janitor_loop, name='cache-janitor', daemon=True).start()
+    if os.getenv('WEATHER_BOARD_ENABLED', '1') == '1':
+        threading.Thread(target=_weather_board_loop, name='weather-board', daemon=True).start()
+    print(f"定时任务已启动，版次: {', '.join(_slot_label(s) for s in EDITION_SLOTS)}")
+    return True
 
 @app.route('/aizaobao/')
 def index():
     """主页"""
-    try:
-        css_path = os.path.join('static', 'css', 'style.css')
-        css_v = str(int(os.path.getmtime(css_path))) if os.path.exists(css_path) else str(int(datetime.now().timestamp()))
-    except Exception:
-        css_v = str(int(datetime.now().timestamp()))
-    return render_template('index.html', css_v=css_v)
+    return render_template('index.html')
 
 @app.route('/aizaobao/api/config', methods=['GET', 'POST'])
 def config_api():
@@ -840,26 +2405,33 @@ def config_api():
 
 @app.route('/aizaobao/api/news')
 def get_news():
-    """获取新闻API"""
+    """获取新闻API（命中内存缓存时直接返回预序列化响应体）"""
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        news_content, news_items, date_str = loop.run_until_complete(get_news_content())
-        loop.close()
-        
-        if news_content:
-            cache_file = get_cache_file_path()
-            is_cached = os.path.exists(cache_file)
-            return jsonify({
-                'success': True,
-                'content': news_content,
-                'items': news_items,
-                'date_str': date_str,
-                'timestamp': datetime.now().isoformat(),
-                'from_cache': is_cached
-            })
-        else:
-            return jsonify({'success': False, 'message': '获取新闻失败（内容为空）'})
+        region = get_request_region()
+        fmt = get_request_format()
+        if not fmt:
+            return jsonify({'success': False, 'message': f'不支持的格式，可选: {", ".join(EDITION_FORMATS)}'})
+        cache_date, slot = get_current_edition()
+        entry = get_edition_body(region, cache_date, slot, fmt)
+        if entry is None:
+            # 当前版次尚未构建完成：先返回上一版次，构建在后台完成，读者不必等待抓取
+            previous = query_editions(region, limit=1, before=(cache_date, slot), columns=['cache_date', 'slot'])
+            if previous:
+                start_edition_build(region, cache_date, slot)
+                entry = get_edition_body(region, previous[0]['cache_date'], previous[0]['slot'], fmt)
+        if entry is None:
+            # 没有任何已发布的版次（首次部署）：抓取（或用候选池重排）后再读取；只占用当前请求线程
+            try:
+                news_content, news_items, date_str = run_async(get_news_content(region), NEWS_BUILD_TIMEOUT)
+            except FutureTimeout:
+                return jsonify({'success': False, 'message': '新闻正在生成中，请稍后刷新'})
+            if not news_content:
+                return jsonify({'success': False, 'message': '获取新闻失败（内容为空）'})
+            entry = get_edition_body(region, cache_date, slot, fmt)
+            if entry is None:
+                return jsonify({'success': False, 'message': '获取新闻失败（缓存写入失败）'})
+        # 当前版次可能被刷新或进入下一版次，每次用 ETag 校验
+        return edition_response(entry, CACHE_CONTROL_REVALIDATE)
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取新闻异常: {str(e)}'})
 
@@ -867,91 +2439,148 @@ def get_news():
 def refresh_news():
     """强制刷新新闻（忽略缓存）"""
     try:
-        cache_file = get_cache_file_path()
-        if os.path.exists(cache_file):
-            os.remove(cache_file)
-            print(f"删除缓存文件: {cache_file}")
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        news_content, news_items, date_str = loop.run_until_complete(get_news_content())
-        loop.close()
+        region = get_request_region()
+        fmt = get_request_format() or 'html'
+        # 强制重新抓取，一次抓取会覆盖当前版次所有区域的缓存
+        try:
+            news_content, news_items, date_str = run_async(get_news_content(region, force=True), NEWS_BUILD_TIMEOUT)
+        except FutureTimeout:
+            return jsonify({'success': False, 'message': '新闻正在刷新中，请稍后刷新页面'})
         
-        if news_content:
-            return jsonify({
-                'success': True,
-                'content': news_content,
-                'items': news_items,
-                'date_str': date_str,
-                'timestamp': datetime.now().isoformat(),
-                'from_cache': False,
-                'message': '新闻已强制刷新'
-            })
+        cache_data = read_news_cache(region, *get_current_edition()) if news_content else None
+        if cache_data:
+            payload = _edition_payload(cache_data, fmt)
+            payload.update({'from_cache': False, 'message': '新闻已强制刷新'})
+            return jsonify(payload)
         else:
             return jsonify({'success': False, 'message': '强制刷新失败'})
     except Exception as e:
         return jsonify({'success': False, 'message': f'强制刷新异常: {str(e)}'})
 
+HISTORY_PAGE_SIZE = 20
+HISTORY_PAGE_MAX = 100
+
 @app.route('/aizaobao/api/history')
 def get_history():
-    """获取历史记录列表"""
+    """获取历史记录列表（游标分页）
+
+    参数：limit 每页条数；cursor 上一页返回的 next_cursor；from/to 日期区间（YYYY-MM-DD）；
+    fields=summary（默认，日期+条数+首条标题）或 full（含全部标题）。详情请用 /api/history/<date>。
+    """
     try:
-        cache_folder = create_cache_folder()
-        history_files = []
+        region = get_request_region()
+        date_from = request.args.get('from')
+        date_to = request.args.get('to')
+        for d in (date_from, date_to):
+            if d and not re.match(r'^\d{4}-\d{2}-\d{2}$', d):
+                return jsonify({'success': False, 'message': '日期格式错误'})
+        fields = request.args.get('fields', 'summary')
+        if fields not in ('summary', 'full'):
+            return jsonify({'success': False, 'message': 'fields 仅支持 summary 或 full'})
+        try:
+            limit = min(max(int(request.args.get('limit', HISTORY_PAGE_SIZE)), 1), HISTORY_PAGE_MAX)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'limit 必须为整数'})
+        before = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            before = _parse_edition_id(cursor)
+            if not before[0]:
+                return jsonify({'success': False, 'message': '游标格式错误'})
         
-        # 扫描缓存目录中的所有新闻文件
-        for filename in os.listdir(cache_folder):
-            if filename.startswith('news_') and filename.endswith('.json'):
-                file_path = os.path.join(cache_folder, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
-                    
-                    history_files.append({
-                        'cache_date': cache_data.get('cache_date'),
-                        'date_str': cache_data.get('date_str'),
-                        'cached_time': cache_data.get('cached_time'),
-                        'news_items': cache_data.get('news_items', []),
-                        'filename': filename
-                    })
-                except Exception as e:
-                    print(f"读取历史文件失败 {filename}: {e}")
-                    continue
+        # 多取一条判断是否还有下一页
+        with metric_timer('aizaobao_history_query_seconds', kind='list'):
+            editions = query_editions(
+                region, date_from, date_to, limit=limit + 1, before=before, columns=HISTORY_SUMMARY_COLUMNS
+            )
+        has_more = len(editions) > limit
+        editions = editions[:limit]
         
-        # 按日期倒序排列
-        history_files.sort(key=lambda x: x['cache_date'], reverse=True)
+        history_files = []
+        for e in editions:
+            entry = {
+                'cache_date': e['cache_date'],
+                'slot': e['slot'],
+                'edition_id': e['edition_id'],
+                'date_str': e['date_str'],
+                'cached_time': e['cached_time'],
+                'region': e['region'],
+                'item_count': len(e['news_items']),
+                'first_headline': e['news_items'][0] if e['news_items'] else ''
+            }
+            if fields == 'full':
+                entry['news_items'] = e['news_items']
+            history_files.append(entry)
         
-        return jsonify({
+        return cacheable_response(jsonify({
             'success': True,
-            'history': history_files
-        })
+            'history': history_files,
+            'next_cursor': editions[-1]['edition_id'] if has_more else None
+        }), CACHE_CONTROL_REVALIDATE)
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取历史记录失败: {str(e)}'})
 
 @app.route('/aizaobao/api/history/<cache_date>')
 def get_history_detail(cache_date):
-    """获取特定日期的历史记录详情"""
+    """获取特定版次的历史记录详情（cache_date 可为 YYYY-MM-DD 或 YYYY-MM-DD_HHMM，仅日期时取当天最新版次）"""
     try:
-        cache_folder = create_cache_folder()
-        cache_file = os.path.join(cache_folder, f"news_{cache_date}.json")
-        
-        if not os.path.exists(cache_file):
+        cache_date, slot = _parse_edition_id(cache_date)
+        if not cache_date:
+            return jsonify({'success': False, 'message': '日期格式错误'})
+        region = get_request_region()
+        with metric_timer('aizaobao_history_query_seconds', kind='detail'):
+            if slot is None:
+                slot = _latest_slot_for_date(cache_date, region)
+            entry = get_edition_body(region, cache_date, slot, get_request_format() or 'html') if slot is not False else None
+        if entry is None:
             return jsonify({'success': False, 'message': '历史记录不存在'})
+        # 早于当前版次的版次不再变化，可长期缓存；当前版次（如首个版次前沿用的前一天最后一版）仍可能被刷新
+        current_date, current_slot = get_current_edition()
+        is_past = cache_date < current_date or (cache_date == current_date and bool(slot) and slot < current_slot)
+        cache_control = CACHE_CONTROL_IMMUTABLE if is_past else CACHE_CONTROL_REVALIDATE
+        return edition_response(entry, cache_control)
         
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
-        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取历史记录详情失败: {str(e)}'})
+
+@app.route('/aizaobao/api/rerank/<cache_date>')
+def rerank_preview(cache_date):
+    """用保存的候选池按当前排序规则预览某版次的早报（不覆盖历史）"""
+    try:
+        cache_date, slot = _parse_edition_id(cache_date)
+        if not cache_date:
+            return jsonify({'success': False, 'message': '日期格式错误'})
+        region = get_request_region()
+        if slot is None:
+            slot = _latest_slot_for_date(cache_date, region) or None
+        content, items, date_str = regenerate_edition(cache_date, region, slot=slot)
+        if content is None:
+            return jsonify({'success': False, 'message': '该日期没有候选池记录'})
         return jsonify({
             'success': True,
-            'content': cache_data.get('formatted_news'),
-            'items': cache_data.get('news_items'),
-            'date_str': cache_data.get('date_str'),
-            'cached_time': cache_data.get('cached_time'),
-            'cache_date': cache_data.get('cache_date')
+            'content': content,
+            'items': items,
+            'date_str': date_str,
+            'cache_date': cache_date,
+            'edition_id': _edition_id(cache_date, slot),
+            'region': region
         })
-        
     except Exception as e:
-        return jsonify({'success': False, 'message': f'获取历史记录详情失败: {str(e)}'})
+        return jsonify({'success': False, 'message': f'重新排序失败: {str(e)}'})
+
+def _cached_audio_payload(audio_id, audio_file, filename):
+    """已生成音频的返回内容（字段与已完成的语音任务一致）"""
+    return {
+        'success': True,
+        'status': 'done',
+        'audio_id': audio_id,
+        'audio_url': f"/aizaobao/api/audio/{audio_id}",
+        'download_url': f"/aizaobao/api/audio/{audio_id}?download=1",
+        'filename': filename,
+        'share_url': f"/aizaobao/static/audio/{audio_file}",
+        'cached': True
+    }
 
 @app.route('/aizaobao/api/generate-audio', methods=['POST'])
 def generate_audio_api():
@@ -959,82 +2588,639 @@ def generate_audio_api():
     try:
         data = request.json
         text = data.get('text', '')
+        edition_id = data.get('edition_id')
+        
+        # 优先使用版次预渲染的朗读稿
+        cache_data = None
+        if edition_id:
+            cache_date, slot = _parse_edition_id(edition_id)
+            cache_data = read_news_cache(get_request_region(), cache_date, slot) if cache_date else None
+            if cache_data:
+                text = get_edition_artifacts(cache_data)['tts']
         
         if not text:
             return jsonify({'success': False, 'message': '文本内容不能为空'})
         
         config = get_user_config()
+        filename = f"shipping_news_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
         
-        # 去除换行符用于API调用
-        clean_text = remove_newlines(text)
+        # 已有相同文本与语音设置的音频时直接返回地址，无需 Minimax 凭据
+        audio_id = tts_cache_key(text, config)
+        audio_file, file_path = get_tts_file_path(audio_id, config)
+        if os.path.exists(file_path):
+            return jsonify(_cached_audio_payload(audio_id, audio_file, filename))
         
-        audio_bytes, error, share_url = generate_audio(clean_text, config)
+        if not config.get('group_id') or not config.get('api_key'):
+            # 未配置凭据时退回版次预生成的默认音色音频
+            m = re.search(r'tts_([0-9a-f]{32})\.\w+$', (cache_data or {}).get('audio_url') or '')
+            if m and find_audio_file(m.group(1))[0]:
+                return jsonify(_cached_audio_payload(m.group(1), m.group(0), filename))
+            return jsonify({'success': False, 'message': '请先配置Minimax API信息'})
         
-        if audio_bytes:
-            # 将音频数据编码为base64
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            
+        # 流式模式（仅 inline 模式）：只登记任务，由播放器请求流地址边合成边播放
+        if data.get('stream') and crawl_locally():
+            key, share_url, cached = register_tts_stream(text, config)
             return jsonify({
                 'success': True,
-                'audio_data': audio_base64,
-                'filename': f"shipping_news_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3",
+                'audio_id': key,
+                'audio_url': f"/aizaobao/api/audio/{key}",
+                'download_url': f"/aizaobao/api/audio/{key}?download=1",
+                'stream_url': f"/aizaobao/api/audio/{key}" if cached else f"/aizaobao/api/tts-stream/{key}",
+                'cached': cached,
+                'filename': filename,
                 'share_url': share_url
             })
-        else:
-            return jsonify({'success': False, 'message': error})
+        
+        # 其余情况提交语音任务并立即返回任务ID，不在请求线程中同步合成；
+        # 客户端轮询 /api/tts-jobs/<job_id>，完成后返回音频地址（worker 模式下由 worker.py 合成）
+        job = submit_tts_job(text, config)
+        return jsonify({'success': True, **job, 'filename': filename})
             
     except Exception as e:
         return jsonify({'success': False, 'message': f'生成音频异常: {str(e)}'})
 
-@app.route('/aizaobao/api/download-audio', methods=['POST'])
-def download_audio():
-    """下载音频文件"""
+@app.route('/aizaobao/api/tts-jobs', methods=['POST'])
+def submit_tts_job_api():
+    """提交语音合成任务（参数同 generate-audio），立即返回任务ID"""
     try:
-        data = request.json
-        audio_data = data.get('audio_data', '')
-        filename = data.get('filename', 'ai_news.mp3')
-        
-        if not audio_data:
-            return jsonify({'success': False, 'message': '音频数据为空'})
-        
-        # 解码base64音频数据
-        audio_bytes = base64.b64decode(audio_data)
-        
-        # 创建内存文件对象
-        audio_file = io.BytesIO(audio_bytes)
-        audio_file.seek(0)
-        
-        return send_file(
-            audio_file,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='audio/mpeg'
-        )
-        
+        data = request.json or {}
+        text = data.get('text', '')
+        edition_id = data.get('edition_id')
+        if edition_id:
+            cache_date, slot = _parse_edition_id(edition_id)
+            cache_data = read_news_cache(get_request_region(), cache_date, slot) if cache_date else None
+            if cache_data:
+                text = get_edition_artifacts(cache_data)['tts']
+        if not text:
+            return jsonify({'success': False, 'message': '文本内容不能为空'})
+        config = get_user_config()
+        if not config.get('group_id') or not config.get('api_key'):
+            return jsonify({'success': False, 'message': '请先配置Minimax API信息'})
+        job = submit_tts_job(text, config)
+        return jsonify({'success': True, **job})
     except Exception as e:
-        return jsonify({'success': False, 'message': f'下载失败: {str(e)}'})
+        return jsonify({'success': False, 'message': f'提交语音任务异常: {str(e)}'})
+
+@app.route('/aizaobao/api/tts-jobs/<job_id>')
+def get_tts_job_api(job_id):
+    """查询语音合成任务状态与进度；完成后返回音频地址"""
+    job = get_tts_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': '任务不存在或已过期'}), 404
+    return jsonify({'success': True, **job})
+
+@app.route('/aizaobao/api/tts-stream/<key>')
+def tts_stream(key):
+    """流式播放：分块转发 Minimax 流式音频，结束后写入音频缓存"""
+    if not re.match(r'^[0-9a-f]{32}$', key):
+        return jsonify({'success': False, 'message': '音频标识错误'}), 400
+    stream = stream_tts_to_cache(key)
+    if stream is None:
+        # 任务已完成（或已过期）时直接返回缓存文件
+        if find_audio_file(key)[0]:
+            return redirect(f"/aizaobao/api/audio/{key}")
+        return jsonify({'success': False, 'message': '音频任务不存在或已过期'}), 404
+    response = Response(stream_with_context(stream), mimetype='audio/mpeg')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+AUDIO_FORMATS = ('mp3', 'wav', 'flac', 'pcm')
+
+def find_audio_file(audio_id):
+    """按音频标识查找缓存文件，返回 (file_path, format) 或 (None, None)"""
+    if not re.match(r'^[0-9a-f]{32}$', audio_id or ''):
+        return None, None
+    for fmt in AUDIO_FORMATS:
+        file_path = os.path.join('static', 'audio', f"tts_{audio_id}.{fmt}")
+        if os.path.exists(file_path):
+            return file_path, fmt
+    return None, None
+
+# 大文件交给前端 Nginx/Apache 发送：x-accel（Nginx X-Accel-Redirect）或 x-sendfile；留空由 Flask 发送
+SENDFILE_MODE = os.getenv('SENDFILE_MODE', '').lower()
+# X-Accel-Redirect 使用的 Nginx internal location 前缀（指向 static 目录）
+SENDFILE_PREFIX = os.getenv('SENDFILE_PREFIX', '/aizaobao/_static/')
+app.config['USE_X_SENDFILE'] = SENDFILE_MODE == 'x-sendfile'
+
+# 内容寻址的音频（文件名即内容哈希）与构建产物 dist/ 内容不会变化，可长期缓存
+CONTENT_ADDRESSED_RE = re.compile(r'^(audio/tts_[0-9a-f]{32}\.\w+|dist/.+)$')
+
+# 静态资源清单（由 build_assets.py 生成），启动时加载一次；未构建时模板引用原始文件
+ASSET_MANIFEST_FILE = os.path.join('static', 'dist', 'manifest.json')
+
+def load_asset_manifest():
+    try:
+        with open(ASSET_MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        print(f"已加载静态资源清单: {len(manifest.get('assets', {}))} 个文件")
+        return manifest
+    except (OSError, ValueError):
+        print("未找到静态资源清单，使用未版本化的静态文件（可运行 python build_assets.py 生成）")
+        return {'assets': {}, 'encodings': {}}
+
+ASSET_MANIFEST = load_asset_manifest()
+
+@app.template_global()
+def asset_url(name):
+    """模板中引用静态资源：有清单时返回带内容哈希的文件地址"""
+    return url_for('static', filename=ASSET_MANIFEST['assets'].get(name, name))
+
+def _precompressed_variant(filename):
+    """构建时生成的预压缩版本：按 Accept-Encoding 返回 (文件名, 编码) 或 (None, None)"""
+    encodings = ASSET_MANIFEST['encodings'].get(filename)
+    if not encodings:
+        return None, None
+    accept = request.accept_encodings
+    if 'br' in encodings and accept['br']:
+        return f"{filename}.br", 'br'
+    if 'gzip' in encodings and accept['gzip']:
+        return f"{filename}.gz", 'gzip'
+    return None, None
+
+def send_static_path(filename, mimetype=None, as_attachment=False, download_name=None):
+    """发送 static 目录下的文件：支持 Range(206)、ETag 条件请求与 X-Accel-Redirect/X-Sendfile"""
+    file_path = safe_join('static', filename)
+    if file_path is None or not os.path.isfile(file_path):
+        return jsonify({'error': '文件不存在'}), 404
+    
+    # 音频被访问时刷新访问时间，供清理任务按 LRU 淘汰
+    if filename.startswith('audio/'):
+        touch_access(file_path)
+    
+    if filename.endswith('.mp3'):
+        mimetype = mimetype or 'audio/mpeg'
+    # 清单中登记过的资源直接发送预压缩文件（x-accel 模式由 Nginx 的 gzip_static 处理）
+    encoded_name, encoding = _precompressed_variant(filename) if SENDFILE_MODE != 'x-accel' else (None, None)
+    if encoded_name:
+        mimetype = mimetype or mimetypes.guess_type(filename)[0]
+        response = send_static_path(encoded_name, mimetype=mimetype)
+        if isinstance(response, Response):
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            response.headers['Cache-Control'] = CACHE_CONTROL_IMMUTABLE
+        return response
+    if SENDFILE_MODE == 'x-accel':
+        # 只返回头部，由 Nginx 读取文件并处理 Range/条件请求
+        response = Response(mimetype=mimetype or mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = SENDFILE_PREFIX + quote(filename)
+        if as_attachment:
+            response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(download_name or os.path.basename(filename))}"
+    else:
+        response = send_file(
+            file_path,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=True,
+            etag=True
+        )
+    if CONTENT_ADDRESSED_RE.match(filename):
+        response.headers['Cache-Control'] = CACHE_CONTROL_IMMUTABLE
+    if filename in ASSET_MANIFEST['encodings']:
+        response.vary.add('Accept-Encoding')
+    return response
+
+@app.route('/aizaobao/api/audio/<audio_id>')
+def get_audio(audio_id):
+    """以二进制返回已生成的音频（支持 Range）；?download=1 时作为附件下载"""
+    file_path, fmt = find_audio_file(audio_id)
+    if not file_path:
+        return jsonify({'success': False, 'message': '音频不存在或已过期'}), 404
+    download = request.args.get('download') == '1'
+    return send_static_path(
+        f"audio/{os.path.basename(file_path)}",
+        mimetype='audio/mpeg' if fmt == 'mp3' else f'audio/{fmt}',
+        as_attachment=download,
+        download_name=request.args.get('filename') or f"shipping_news_{audio_id[:8]}.{fmt}"
+    )
 
 @app.route('/aizaobao/static/<path:filename>')
 def serve_static_files(filename):
     """处理静态文件请求（音频文件分享）"""
     try:
-        # 构建文件路径
-        file_path = os.path.join('static', filename)
-        
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            return jsonify({'error': '文件不存在'}), 404
-        
-        # 返回文件
-        return send_file(
-            file_path,
-            as_attachment=False,  # 不强制下载，可以在浏览器中播放
-            mimetype='audio/mpeg' if filename.endswith('.mp3') else None
-        )
-        
+        return send_static_path(filename)
     except Exception as e:
         return jsonify({'error': f'访问文件失败: {str(e)}'}), 500
 
+# Flask 内置的 static 端点与上面的路由规则相同且优先匹配，这里让它也走自定义处理
+app.view_functions['static'] = serve_static_files
+
+@app.route('/aizaobao/api/janitor')
+def janitor_stats():
+    """最近一次后台清理任务的统计"""
+    try:
+        if not os.path.exists(JANITOR_STATS_FILE):
+            return jsonify({'success': False, 'message': '清理任务尚未运行'})
+        with open(JANITOR_STATS_FILE, 'r', encoding='utf-8') as f:
+            return jsonify({'success': True, 'stats': json.load(f)})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'读取清理统计失败: {str(e)}'})
+
+def metrics_snapshot():
+    """本进程指标快照 [[名称, 标签值, 值], ...]，含翻译缓存命中数、启动耗时与内存等即时数值"""
+    info = _translate_to_zh.cache_info()
+    rss_mb = _current_rss_mb()
+    with _metrics_lock:
+        samples = [
+            [name, list(labels), [list(value[0]), value[1], value[2]] if isinstance(value, list) else value]
+            for (name, labels), value in _metric_values.items()
+        ]
+    samples += [
+        ['aizaobao_translation_cache_total', ['hit'], info.hits],
+        ['aizaobao_translation_cache_total', ['miss'], info.misses],
+        ['aizaobao_startup_seconds', [], STARTUP_STATS['seconds']],
+    ]
+    if rss_mb is not None:
+        samples.append(['aizaobao_resident_memory_bytes', [], int(rss_mb * 1024 * 1024)])
+    return samples
+
+def _metrics_role():
+    return 'worker' if IS_CRAWLER_PROCESS else 'web'
+
+def write_metrics_snapshot():
+    """把本进程指标快照写入 cache/metrics/<角色>-<pid>.json"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{_metrics_role()}-{os.getpid()}.json")
+    with open(path + '.part', 'w', encoding='utf-8') as f:
+        json.dump(metrics_snapshot(), f, ensure_ascii=False)
+    os.replace(path + '.part', path)
+
+def _metrics_writer_loop():
+    while True:
+        time.sleep(METRICS_SNAPSHOT_INTERVAL)
+        try:
+            write_metrics_snapshot()
+        except Exception as e:
+            print(f"写入指标快照失败: {e}")
+
+def _ensure_metrics_writer():
+    """多进程部署时，本进程首次记录指标后启动快照写入线程（fork 后按 pid 重新启动）"""
+    global _metrics_writer_pid
+    if CRAWL_MODE != 'worker' or _metrics_writer_pid == os.getpid():
+        return
+    with _metrics_lock:
+        if _metrics_writer_pid == os.getpid():
+            return
+        _metrics_writer_pid = os.getpid()
+    threading.Thread(target=_metrics_writer_loop, name='metrics-writer', daemon=True).start()
+
+def collect_metric_sources():
+    """{(角色, pid): 快照}：本进程取实时数据，其他进程读取最近写入的快照（过期的快照视为进程已退出并删除）"""
+    own = (_metrics_role(), str(os.getpid()))
+    sources = {own: metrics_snapshot()}
+    if CRAWL_MODE != 'worker' or not os.path.isdir(METRICS_DIR):
+        return sources
+    now = time.time()
+    for name in os.listdir(METRICS_DIR):
+        m = re.match(r'^(web|worker)-(\d+)\.json$', name)
+        if not m or (m.group(1), m.group(2)) == own:
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > METRICS_SNAPSHOT_INTERVAL * 4:
+                os.remove(path)
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                sources[(m.group(1), m.group(2))] = json.load(f)
+        except (OSError, ValueError):
+            continue
+    return sources
+
+def _format_metric_labels(pairs):
+    """标签转为 {k="v",...}，按规范转义反斜杠、引号与换行"""
+    def escape(v):
+        return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in pairs) + '}'
+
+def render_metrics(sources) -> str:
+    """按 Prometheus 文本格式输出各进程的指标（带 process/pid 标签，汇总时按需 sum）"""
+    series = {}
+    for (role, pid), samples in sources.items():
+        for name, labels, value in samples:
+            if name in METRICS:
+                pairs = (('process', role), ('pid', pid)) + tuple(zip(METRICS[name][2], labels))
+                series.setdefault(name, []).append((pairs, value))
+    lines = []
+    for name, (kind, help_text, _) in METRICS.items():
+        if name not in series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for pairs, value in series[name]:
+            if kind != 'histogram':
+                lines.append(f"{name}{_format_metric_labels(pairs)} {value}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, c in zip(METRIC_BUCKETS, counts):
+                cumulative += c
+                lines.append(f"{name}_bucket{_format_metric_labels(pairs + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_metric_labels(pairs + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_metric_labels(pairs)} {total}")
+            lines.append(f"{name}_count{_format_metric_labels(pairs)} {count}")
+    return '\n'.join(lines) + '\n'
+
+@app.route('/aizaobao/metrics')
+def metrics():
+    """运行指标（Prometheus 文本格式）"""
+    return Response(render_metrics(collect_metric_sources()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# 城市与海区天气并行请求，共用一个总时限；海区超时则只返回城市天气
+WEATHER_DEADLINE = float(os.getenv('WEATHER_DEADLINE', '8'))
+_weather_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='weather')
+
+def _fetch_wttr(query, timeout):
+    """请求 wttr.in 的 JSON 数据，失败返回 None"""
+    started = time.perf_counter()
+    result = 'error'
+    try:
+        r = requests.get(f"https://wttr.in/{quote(query)}?format=j1&lang=zh", timeout=timeout)
+        if r.status_code != 200:
+            return None
+        data = r.json()
+        result = 'ok'
+        return data
+    finally:
+        metric_observe('aizaobao_weather_request_seconds', time.perf_counter() - started, result=result)
+
+def _match_marine(text):
+    """按地名匹配海区（如天津 => 渤海湾）"""
+    for k, v in MARINE_ALIAS.items():
+        if k in text:
+            return v
+    return None
+
+def _parse_marine(alias, d2):
+    cur2 = d2.get('current_condition', [{}])[0]
+    mk = float(cur2.get('windspeedKmph') or 0)
+    md = cur2.get('winddir16Point') or ''
+    return {
+        'name': alias['name'],
+        'wind': {
+            'dir': WIND_DIR_CN.get(md, md),
+            'kmph': mk,
+            'bft': _beaufort_from_kmph(mk)
+        }
+    }
+
+def fetch_weather(loc):
+    """请求 wttr.in 并解析为天气简报，返回 (data, error)
+
+    城市与海区并行请求，总耗时不超过 WEATHER_DEADLINE；海区未按时返回时 data['partial'] 为 True。
+    """
+    deadline = time.time() + WEATHER_DEADLINE
+    # 先按请求地名匹配海区，兼容 "Tianjin"/"天津港" 等，与城市天气同时发出
+    alias = _match_marine(f"{CITY_ZH_MAP.get(loc.strip().lower(), loc)}{loc}")
+    city_future = _weather_pool.submit(_fetch_wttr, loc, WEATHER_DEADLINE)
+    marine_future = _weather_pool.submit(_fetch_wttr, alias['query'], WEATHER_DEADLINE) if alias else None
+
+    try:
+        data = city_future.result(timeout=max(deadline - time.time(), 0))
+    except FutureTimeout:
+        return None, '天气服务响应超时'
+    if not data:
+        return None, '天气服务不可用'
+    # 当前天气
+    current = data.get('current_condition', [{}])[0]
+    area = data.get('nearest_area', [{}])[0]
+    raw_area = (area.get('areaName', [{}])[0].get('value') or loc) if isinstance(area.get('areaName', []), list) else loc
+    area_key = (raw_area or '').strip().lower()
+    area_name = CITY_ZH_MAP.get(area_key, raw_area)
+    temp_c = current.get('temp_C')
+    desc = (current.get('weatherDesc', [{}])[0].get('value')) if isinstance(current.get('weatherDesc', []), list) else ''
+    desc = _to_zh_desc(desc)
+    wind_kmph = float(current.get('windspeedKmph') or 0)
+    wind_dir = current.get('winddir16Point') or ''
+    wind_dir_cn = WIND_DIR_CN.get(wind_dir, wind_dir)
+    bft = _beaufort_from_kmph(wind_kmph)
+    # 未来2天天气
+    weather = data.get('weather', [])
+    forecast = []
+    for w in weather[:2]:
+        date_v = w.get('date')
+        maxt = w.get('maxtempC')
+        mint = w.get('mintempC')
+        forecast.append({'date': date_v, 'maxC': maxt, 'minC': mint})
+
+    # 海区：请求地名未匹配时，用 wttr.in 返回的规范化地名再匹配一次（此时只能在剩余时间内请求）
+    if not alias:
+        alias = _match_marine(f"{area_name}{loc}")
+        if alias and deadline - time.time() > 1:
+            marine_future = _weather_pool.submit(_fetch_wttr, alias['query'], deadline - time.time())
+    marine = None
+    partial = False
+    if marine_future:
+        try:
+            d2 = marine_future.result(timeout=max(deadline - time.time(), 0))
+            marine = _parse_marine(alias, d2) if d2 else None
+        except FutureTimeout:
+            partial = True
+        except Exception:
+            marine = None
+    elif alias:
+        partial = True
+    return {
+        'location': area_name,
+        'current': {'tempC': temp_c, 'desc': desc, 'wind': {'dir': wind_dir_cn, 'kmph': wind_kmph, 'bft': bft}},
+        'forecast': forecast,
+        'marine': marine,
+        'partial': partial
+    }, None
+
+# 天气缓存策略：有效期 WEATHER_TTL 内直接返回；剩余不足 20% 时后台提前刷新；
+# 过期后仍先返回旧数据并后台刷新（最多沿用 WEATHER_STALE_MAX 秒），同一位置同时只请求一次 wttr.in
+WEATHER_REFRESH_AHEAD = 0.8
+WEATHER_STALE_MAX = int(os.getenv('WEATHER_STALE_MAX', '3600'))
+WEATHER_CACHE_FILE = os.path.join('cache', 'weather.json')
+# 位置由请求参数决定，缓存条目数设上限，超出时淘汰最久未使用的位置
+WEATHER_CACHE_MAX_ENTRIES = max(int(os.getenv('WEATHER_CACHE_MAX_ENTRIES', '256')), 1)
+_weather_lock = threading.Lock()
+_weather_inflight = {}
+
+def _prune_weather_cache():
+    """删除超过最长沿用期的条目，并按 LRU 淘汰到 WEATHER_CACHE_MAX_ENTRIES 以内（调用方持有锁）"""
+    expired = time.time() - WEATHER_TTL - WEATHER_STALE_MAX
+    for key in [k for k, entry in _weather_cache.items() if entry['ts'] < expired]:
+        del _weather_cache[key]
+    while len(_weather_cache) > WEATHER_CACHE_MAX_ENTRIES:
+        _weather_cache.popitem(last=False)
+
+def _load_weather_cache():
+    """启动时恢复持久化的天气缓存（按获取时间排序，过期条目丢弃）"""
+    try:
+        with open(WEATHER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return
+    with _weather_lock:
+        _weather_cache.update(sorted(entries.items(), key=lambda kv: kv[1]['ts']))
+        _prune_weather_cache()
+
+def _save_weather_cache():
+    try:
+        with _weather_lock:
+            _prune_weather_cache()
+            snapshot = json.dumps(_weather_cache, ensure_ascii=False)
+        create_cache_folder()
+        tmp_path = f"{WEATHER_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, WEATHER_CACHE_FILE)
+    except OSError as e:
+        print(f"保存天气缓存失败: {e}")
+
+def _refresh_weather(key, loc):
+    """获取并写入缓存；同一位置并发调用时只有一个线程请求 wttr.in，其余等待结果"""
+    with _weather_lock:
+        waiter = _weather_inflight.get(key)
+        leader = waiter is None
+        if leader:
+            waiter = {'event': threading.Event(), 'result': (None, '天气服务不可用')}
+            _weather_inflight[key] = waiter
+    if not leader:
+        waiter['event'].wait()
+        return waiter['result']
+    try:
+        data, error = fetch_weather(loc)
+        if data:
+            # 缺少海区数据的结果只短暂缓存，下次请求即在后台补全
+            ts = time.time() - (WEATHER_TTL * WEATHER_REFRESH_AHEAD if data.get('partial') else 0)
+            with _weather_lock:
+                _weather_cache[key] = {'data': data, 'ts': ts}
+                _weather_cache.move_to_end(key)
+            _save_weather_cache()
+        waiter['result'] = (data, error)
+    except Exception as e:
+        waiter['result'] = (None, f'获取天气失败: {str(e)}')
+    finally:
+        with _weather_lock:
+            _weather_inflight.pop(key, None)
+        waiter['event'].set()
+    return waiter['result']
+
+def get_cached_weather(loc):
+    """按位置读取天气缓存，返回 (data, error, age_seconds)"""
+    key = loc.strip().lower()
+    with _weather_lock:
+        entry = _weather_cache.get(key)
+        if entry:
+            _weather_cache.move_to_end(key)
+        refreshing = key in _weather_inflight
+    if entry:
+        age = time.time() - entry['ts']
+        if age < WEATHER_TTL * WEATHER_REFRESH_AHEAD:
+            return entry['data'], None, age
+        if age < WEATHER_TTL + WEATHER_STALE_MAX:
+            if not refreshing:
+                threading.Thread(target=_refresh_weather, args=(key, loc), name='weather-refresh', daemon=True).start()
+            return entry['data'], None, age
+    data, error = _refresh_weather(key, loc)
+    if data:
+        return data, None, 0
+    # 请求失败时沿用旧数据
+    if entry:
+        return entry['data'], None, time.time() - entry['ts']
+    return None, error, 0
+
+_load_weather_cache()
+
+# 港口/海区天气看板：后台任务定期批量刷新并写入 cache/weather_board.json，接口只读缓存
+SEA_AREA_QUERIES = {
+    '渤海湾': 'Bohai Sea',
+    '渤海': 'Bohai Sea',
+    '黄海': 'Yellow Sea',
+    '东海': 'East China Sea',
+    '台湾海峡': 'Taiwan Strait',
+    '南海': 'South China Sea',
+}
+WEATHER_BOARD_PORTS = [p.strip() for p in (os.getenv('WEATHER_BOARD_PORTS') or ','.join(MARINE_AREA_MAP)).split(',') if p.strip()]
+WEATHER_BOARD_INTERVAL = int(os.getenv('WEATHER_BOARD_INTERVAL', str(WEATHER_TTL)))
+WEATHER_BOARD_FILE = os.path.join('cache', 'weather_board.json')
+# 看板批量请求使用独立的线程池，不占用交互天气请求的 _weather_pool
+WEATHER_BOARD_CONCURRENCY = max(int(os.getenv('WEATHER_BOARD_CONCURRENCY', '2')), 1)
+_weather_board = {'mtime': None, 'body': None}
+
+def _parse_board_entry(data):
+    """看板条目：当前天气、蒲福风级与两天预报（含预报最大风级）"""
+    current = data.get('current_condition', [{}])[0]
+    desc = (current.get('weatherDesc', [{}])[0].get('value')) if isinstance(current.get('weatherDesc', []), list) else ''
+    kmph = float(current.get('windspeedKmph') or 0)
+    wind_dir = current.get('winddir16Point') or ''
+    forecast = []
+    for w in data.get('weather', [])[:2]:
+        max_kmph = max((float(h.get('windspeedKmph') or 0) for h in w.get('hourly', [])), default=0)
+        forecast.append({
+            'date': w.get('date'), 'maxC': w.get('maxtempC'), 'minC': w.get('mintempC'),
+            'maxWindBft': _beaufort_from_kmph(max_kmph)
+        })
+    return {
+        'tempC': current.get('temp_C'),
+        'desc': _to_zh_desc(desc),
+        'wind': {'dir': WIND_DIR_CN.get(wind_dir, wind_dir), 'kmph': kmph, 'bft': _beaufort_from_kmph(kmph)},
+        'forecast': forecast
+    }
+
+def _fetch_board_entry(query):
+    data = _fetch_wttr(query, WEATHER_DEADLINE)
+    return _parse_board_entry(data) if data else None
+
+def refresh_weather_board():
+    """批量获取看板中的港口与海区天气（同一海区只请求一次），结果写入缓存文件"""
+    areas = sorted({MARINE_AREA_MAP[p] for p in WEATHER_BOARD_PORTS if p in MARINE_AREA_MAP})
+    queries = {('port', p): p for p in WEATHER_BOARD_PORTS}
+    queries.update({('sea', a): SEA_AREA_QUERIES.get(a, a) for a in areas})
+    # 渤海/渤海湾等共用同一查询，只请求一次
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=WEATHER_BOARD_CONCURRENCY, thread_name_prefix='weather-board') as pool:
+        futures = {q: pool.submit(_fetch_board_entry, q) for q in set(queries.values())}
+        for q, future in futures.items():
+            try:
+                fetched[q] = future.result()
+            except Exception as e:
+                print(f"看板天气获取失败 {q}: {e}")
+                fetched[q] = None
+    results = {key: fetched[q] for key, q in queries.items()}
+    sea_areas = [{'name': a, **(results[('sea', a)] or {'error': '暂无数据'})} for a in areas]
+    ports = []
+    for p in WEATHER_BOARD_PORTS:
+        area = MARINE_AREA_MAP.get(p)
+        ports.append({
+            'name': p,
+            'sea_area': area,
+            **(results[('port', p)] or {'error': '暂无数据'}),
+            'marine': results.get(('sea', area)) and {'name': area, 'wind': results[('sea', area)]['wind']}
+        })
+    board = {'success': True, 'updated_at': datetime.now().isoformat(timespec='seconds'),
+             'ports': ports, 'sea_areas': sea_areas}
+    create_cache_folder()
+    tmp_path = f"{WEATHER_BOARD_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(board, f, ensure_ascii=False)
+    os.replace(tmp_path, WEATHER_BOARD_FILE)
+    failed = sum(1 for v in fetched.values() if v is None)
+    print(f"天气看板已刷新：{len(ports)} 个港口，{len(sea_areas)} 个海区，失败 {failed} 个")
+    return board
+
+def _weather_board_loop():
+    while True:
+        try:
+            refresh_weather_board()
+        except Exception as e:
+            print(f"天气看板刷新失败: {e}")
+        time.sleep(WEATHER_BOARD_INTERVAL)
+
+def get_weather_board_body():
+    """读取看板缓存（文件 mtime 不变时复用内存中的响应体），返回 (body, mtime)"""
+    try:
+        mtime = os.stat(WEATHER_BOARD_FILE).st_mtime_ns
+    except OSError:
+        return None, None
+    if _weather_board['mtime'] != mtime:
+        with open(WEATHER_BOARD_FILE, 'rb') as f:
+            _weather_board['body'] = f.read()
+        _weather_board['mtime'] = mtime
+    return _weather_board['body'], mtime
+
 @app.route('/aizaobao/api/weather')
 def get_weather():
     """根据配置或查询参数返回天气简报（用于头部滚动条）"""
@@ -1043,68 +3229,23 @@ def get_weather():
         if not loc:
             cfg = get_user_config()
             loc = cfg.get('weather_location') or '天津'
-        # wttr.in 中文
-        qloc = quote(loc)
-        url = f"https://wttr.in/{qloc}?format=j1&lang=zh"
-        r = requests.get(url, timeout=10)
-        if r.status_code != 200:
-            return jsonify({'success': False, 'message': '天气服务不可用'})
-        data = r.json()
-        # 当前天气
-        current = data.get('current_condition', [{}])[0]
-        area = data.get('nearest_area', [{}])[0]
-        raw_area = (area.get('areaName', [{}])[0].get('value') or loc) if isinstance(area.get('areaName', []), list) else loc
-        area_key = (raw_area or '').strip().lower()
-        area_name = CITY_ZH_MAP.get(area_key, raw_area)
-        temp_c = current.get('temp_C')
-        desc = (current.get('weatherDesc', [{}])[0].get('value')) if isinstance(current.get('weatherDesc', []), list) else ''
-        desc = _to_zh_desc(desc)
-        wind_kmph = float(current.get('windspeedKmph') or 0)
-        wind_dir = current.get('winddir16Point') or ''
-        wind_dir_cn = WIND_DIR_CN.get(wind_dir, wind_dir)
-        bft = _beaufort_from_kmph(wind_kmph)
-        # 未来2天天气
-        weather = data.get('weather', [])
-        forecast = []
-        for w in weather[:2]:
-            date_v = w.get('date')
-            maxt = w.get('maxtempC')
-            mint = w.get('mintempC')
-            forecast.append({'date': date_v, 'maxC': maxt, 'minC': mint})
-        # 海区（如天津 => 渤海湾）
-        marine = None
-        # 使用规范化后的中文地名进行匹配，兼容 "Tianjin"/"天津港" 等
-        match_text = f"{area_name}{loc}"
-        for k, v in MARINE_ALIAS.items():
-            if k in match_text:
-                try:
-                    r2 = requests.get(f"https://wttr.in/{quote(v['query'])}?format=j1&lang=zh", timeout=10)
-                    if r2.status_code == 200:
-                        d2 = r2.json()
-                        cur2 = d2.get('current_condition', [{}])[0]
-                        mk = float(cur2.get('windspeedKmph') or 0)
-                        md = cur2.get('winddir16Point') or ''
-                        marine = {
-                            'name': v['name'],
-                            'wind': {
-                                'dir': WIND_DIR_CN.get(md, md),
-                                'kmph': mk,
-                                'bft': _beaufort_from_kmph(mk)
-                            }
-                        }
-                except Exception:
-                    marine = None
-                break
-        return jsonify({
-            'success': True,
-            'location': area_name,
-            'current': {'tempC': temp_c, 'desc': desc, 'wind': {'dir': wind_dir_cn, 'kmph': wind_kmph, 'bft': bft}},
-            'forecast': forecast,
-            'marine': marine
-        })
+        data, error, age = get_cached_weather(loc)
+        if not data:
+            return jsonify({'success': False, 'message': error})
+        # 浏览器缓存到本地副本过期为止
+        return cacheable_response(jsonify({'success': True, **data}), f'max-age={max(int(WEATHER_TTL - age), 0)}')
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取天气失败: {str(e)}'})
 
+@app.route('/aizaobao/api/weather/board')
+def get_weather_board():
+    """港口与海区天气看板（只读后台任务刷新的缓存）"""
+    body, mtime = get_weather_board_body()
+    if body is None:
+        return jsonify({'success': False, 'message': '天气看板数据准备中，请稍后再试'})
+    response = Response(body, mimetype='application/json')
+    return cacheable_response(response, f'max-age={WEATHER_BOARD_INTERVAL}', etag=f"board-{mtime}")
+
 # 根路径重定向，避免访问 '/' 时 404
 @app.route('/')
 def root_redirect():
@@ -1118,6 +3259,26 @@ def favicon_handler():
         return send_file(favicon_path, mimetype='image/x-icon')
     return ('', 204)
 
+def _current_rss_mb():
+    """当前进程常驻内存（MB），非 Linux 平台返回 None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+STARTUP_STATS = {
+    'seconds': round(time.perf_counter() - _STARTUP_BEGAN, 3),
+    'rss_mb': _current_rss_mb(),
+    'crawler_loaded': 'crawl4ai' in sys.modules
+}
+print(f"应用加载完成：耗时 {STARTUP_STATS['seconds'] * 1000:.0f}ms"
+      + (f"，内存 {STARTUP_STATS['rss_mb']:.1f}MB" if STARTUP_STATS['rss_mb'] is not None else '')
+      + ("，已加载抓取依赖" if STARTUP_STATS['crawler_loaded'] else ''))
+
 if __name__ == '__main__':
     # 创建templates、static、cache和audio目录
     os.makedirs('templates', exist_ok=True)
@@ -1125,4 +3286,7 @@ if __name__ == '__main__':
     os.makedirs('static/audio', exist_ok=True)
     os.makedirs('cache', exist_ok=True)
     
+    # debug 模式下重载器会启动子进程，仅在实际服务进程中启动定时任务
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_jobs()
     app.run(debug=True, host='0.0.0.0', port=6888)
@@ -0,0 +1,63 @@
+"""
+构建静态资源：为 CSS/JS 生成带内容哈希的文件名及预压缩版本，并写出资源清单
+
+用法: python build_assets.py
+输出: static/dist/<原路径>.<hash>.<ext>（及 .gz / .br）与 static/dist/manifest.json
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = 'static'
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_FILE = os.path.join(DIST_DIR, 'manifest.json')
+# 需要版本化的资源（相对 static 目录）
+ASSETS = ['css/style.css', 'js/app.js']
+
+
+def build():
+    """生成哈希文件名资源与清单，返回清单字典"""
+    # 每次全量重建，旧版本文件一并清除
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    manifest = {'assets': {}, 'encodings': {}}
+    for name in ASSETS:
+        src = os.path.join(STATIC_DIR, name)
+        with open(src, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        base, ext = os.path.splitext(name)
+        hashed = f"dist/{base}.{digest}{ext}"
+        dest = os.path.join(STATIC_DIR, hashed)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, 'wb') as f:
+            f.write(data)
+
+        encodings = []
+        if brotli:
+            with open(dest + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+            encodings.append('br')
+        with open(dest + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        encodings.append('gzip')
+
+        manifest['assets'][name] = hashed
+        manifest['encodings'][hashed] = encodings
+        print(f"{name} -> {hashed}（{', '.join(encodings)}）")
+
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"资源清单已写入 {MANIFEST_FILE}")
+    return manifest
+
+
+if __name__ == '__main__':
+    build()
@@ -4,9 +4,12 @@ import os
 
 # 服务器配置
 bind = f"0.0.0.0:{os.getenv('PORT', '6888')}"
-# 使用单个worker避免playwright浏览器冲突
+# inline 模式抓取与语音合成在 Web 进程内进行，保持单个worker避免playwright浏览器冲突；
+# CRAWL_MODE=worker 时这些任务由 worker.py 进程执行，Web 进程只入队和读取结果，可调大 WORKERS
 workers = int(os.getenv('WORKERS', '1'))
-worker_class = 'sync'
+# 线程 worker：抓取在常驻事件循环中进行，只占用发起请求的线程，天气/配置/历史等请求照常处理
+worker_class = 'gthread'
+threads = int(os.getenv('THREADS', '8'))
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 100
@@ -33,3 +36,8 @@ limit_request_field_size = 8190
 
 # 性能配置
 worker_tmp_dir = '/dev/shm'
+
+# 钩子：在 worker 中启动版次定时任务（文件锁保证多 worker 时只运行一份；CRAWL_MODE=worker 时由 worker.py 运行）
+def post_fork(server, worker):
+    from app import start_background_jobs
+    start_background_jobs()
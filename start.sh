@@ -6,6 +6,8 @@
 APP_NAME="AI早报平台"
 PID_FILE="/tmp/aizaobao.pid"
 LOG_FILE="/tmp/aizaobao.log"
+WORKER_PID_FILE="/tmp/aizaobao-worker.pid"
+WORKER_LOG_FILE="/tmp/aizaobao-worker.log"
 
 # 获取应用进程ID
 get_pid() {
@@ -72,9 +74,20 @@ start_app() {
     # 创建必要的目录
     mkdir -p templates static/css static/js cache static/audio
 
+    # 生成带内容哈希的静态资源与清单
+    python3 build_assets.py > /dev/null
+
     echo "🌐 应用将在 http://localhost:6888/aizaobao 启动"
     echo "📋 缓存功能已启用 - 每天首次访问获取最新新闻，后续使用缓存"
 
+    # CRAWL_MODE=worker：抓取与语音合成由独立的任务进程执行
+    if [ "$CRAWL_MODE" = "worker" ]; then
+        echo "🧵 正在启动任务进程 worker.py..."
+        setsid nohup python3 worker.py > "$WORKER_LOG_FILE" 2>&1 < /dev/null &
+        echo $! > "$WORKER_PID_FILE"
+        disown
+    fi
+
     # 检查运行模式
     if [ "$FLASK_ENV" = "production" ]; then
         echo "🏭 生产环境模式"
@@ -100,6 +113,7 @@ start_app() {
     if is_running; then
         echo "✅ $APP_NAME 启动成功！"
         echo "📊 查看日志: tail -f $LOG_FILE"
+        [ "$CRAWL_MODE" = "worker" ] && echo "🧵 任务进程日志: tail -f $WORKER_LOG_FILE"
         echo "🛑 停止服务: ./start.sh stop"
     else
         echo "❌ $APP_NAME 启动失败，请查看日志: cat $LOG_FILE"
@@ -129,10 +143,12 @@ stop_app() {
     echo "🧹 清理相关进程..."
     pkill -f "gunicorn.*app:app" 2>/dev/null || true
     pkill -f "python.*app.py" 2>/dev/null || true
+    pkill -f "python.*worker.py" 2>/dev/null || true
     
     # 清理PID文件
     echo "🗑️  清理PID文件..."
     rm -f "$PID_FILE"
+    rm -f "$WORKER_PID_FILE"
     rm -f "/tmp/gunicorn.pid" 2>/dev/null || true
     
     # 等待进程完全退出
@@ -182,10 +198,12 @@ cleanup_app() {
     echo "🔪 强制终止所有相关进程..."
     pkill -9 -f "gunicorn.*app:app" 2>/dev/null || true
     pkill -9 -f "python.*app.py" 2>/dev/null || true
+    pkill -9 -f "python.*worker.py" 2>/dev/null || true
     
     # 清理所有PID文件
     echo "🗑️  清理所有PID文件..."
     rm -f "$PID_FILE" 2>/dev/null || true
+    rm -f "$WORKER_PID_FILE" 2>/dev/null || true
     rm -f "/tmp/gunicorn.pid" 2>/dev/null || true
     
     # 清理端口占用
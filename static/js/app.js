@@ -1,9 +1,12 @@
 // 全局变量
-let currentAudioData = null;
+let currentAudioUrl = null;
 let currentFilename = null;
 let currentShareUrl = null;
+let currentStreamUrl = null;
 let isGenerating = false;
 let currentNewsContent = null;
+let currentNewsText = null;
+let currentEditionId = null;
 let currentWeatherText = null;
 let weatherRefreshTimer = null;
 
@@ -203,6 +206,7 @@ async function loadConfig() {
         document.getElementById('pitch') && (document.getElementById('pitch').value = config.pitch || 0);
         document.getElementById('vol') && (document.getElementById('vol').value = config.vol || 1.0);
         document.getElementById('weatherLocation') && (document.getElementById('weatherLocation').value = config.weather_location || '上海');
+        document.getElementById('region') && (document.getElementById('region').value = config.region || '');
 
         document.getElementById('speedValue') && (document.getElementById('speedValue').textContent = config.speed || 1.0);
         document.getElementById('pitchValue') && (document.getElementById('pitchValue').textContent = config.pitch || 0);
@@ -225,6 +229,7 @@ async function saveSettings() {
     const pitchEl = document.getElementById('pitch');
     const volEl = document.getElementById('vol');
     const weatherEl = document.getElementById('weatherLocation');
+    const regionEl = document.getElementById('region');
 
     const config = {
         group_id: groupIdEl ? groupIdEl.value : '',
@@ -235,7 +240,8 @@ async function saveSettings() {
         speed: parseFloat(speedEl ? (speedEl.value || '1.0') : '1.0'),
         pitch: parseInt(pitchEl ? (pitchEl.value || '0') : '0'),
         vol: parseFloat(volEl ? (volEl.value || '1.0') : '1.0'),
-        weather_location: (weatherEl ? weatherEl.value : '上海')
+        weather_location: (weatherEl ? weatherEl.value : '上海'),
+        region: regionEl ? regionEl.value : ''
     };
 
     try {
@@ -252,8 +258,9 @@ async function saveSettings() {
         if (result.success) {
             showMessage('配置保存成功！', 'success');
             toggleSettings();
-            // 重新加载天气
+            // 重新加载天气与对应区域的早报
             loadWeatherTicker(true);
+            loadNews();
         } else {
             showMessage(result.message || '配置保存失败', 'error');
         }
@@ -276,6 +283,8 @@ function resetSettings() {
         document.getElementById('vol').value = 1.0;
         const wl = document.getElementById('weatherLocation');
         if (wl) wl.value = '';
+        const rg = document.getElementById('region');
+        if (rg) rg.value = '';
 
         document.getElementById('speedValue').textContent = '1.0';
         document.getElementById('pitchValue').textContent = '0';
@@ -302,8 +311,10 @@ async function loadNews() {
         const result = await response.json();
 
         if (result.success) {
-            // 保存原始新闻内容用于复制
+            // 保存原始新闻内容；复制使用服务端预渲染的纯文本
             currentNewsContent = result.content;
+            currentNewsText = result.text || result.content;
+            currentEditionId = result.edition_id || null;
 
             // 格式化新闻内容显示
             const lines = result.content.split('\n');
@@ -335,6 +346,8 @@ async function loadNews() {
             generateBtn.disabled = false;
             document.getElementById('copyBtn').disabled = false;
 
+            useEditionAudio(result.audio_url);
+
             showMessage('新闻加载成功！', 'success');
         } else {
             newsContent.innerHTML = `
@@ -365,13 +378,34 @@ async function loadNews() {
     }
 }
 
+// 版次已预生成默认音色音频时直接启用播放、下载和分享（无需配置 Minimax）
+function useEditionAudio(audioUrl) {
+    const match = audioUrl && audioUrl.match(/tts_([0-9a-f]{32})\.\w+$/);
+    if (!match) return;
+
+    currentAudioUrl = `/aizaobao/api/audio/${match[1]}`;
+    currentStreamUrl = currentAudioUrl;
+    currentShareUrl = audioUrl;
+    currentFilename = `shipping_news_${currentEditionId || match[1]}.mp3`;
+    document.getElementById('audioElement').src = currentAudioUrl;
+
+    document.getElementById('playBtn').disabled = false;
+    document.getElementById('downloadBtn').disabled = false;
+    const shareBtn = document.getElementById('shareBtn');
+    shareBtn.disabled = false;
+    shareBtn.style.display = 'inline-flex';
+}
+
 // 刷新新闻
 async function refreshNews() {
     // 重置音频相关状态
-    currentAudioData = null;
+    currentAudioUrl = null;
     currentFilename = null;
     currentShareUrl = null;
+    currentStreamUrl = null;
     currentNewsContent = null;
+    currentNewsText = null;
+    currentEditionId = null;
 
     const playBtn = document.getElementById('playBtn');
     const downloadBtn = document.getElementById('downloadBtn');
@@ -409,8 +443,10 @@ async function refreshNews() {
         const result = await response.json();
 
         if (result.success) {
-            // 保存原始新闻内容用于复制
+            // 保存原始新闻内容；复制使用服务端预渲染的纯文本
             currentNewsContent = result.content;
+            currentNewsText = result.text || result.content;
+            currentEditionId = result.edition_id || null;
 
             // 格式化新闻内容显示
             const lines = result.content.split('\n');
@@ -442,6 +478,8 @@ async function refreshNews() {
             generateBtn.disabled = false;
             copyBtn.disabled = false;
 
+            useEditionAudio(result.audio_url);
+
             showMessage('新闻已刷新！缓存已清除，获取到最新内容', 'success');
         } else {
             newsContent.innerHTML = `
@@ -467,10 +505,13 @@ async function refreshNews() {
 // 强制刷新新闻（忽略缓存）
 async function forceRefreshNews() {
     // 重置音频相关状态
-    currentAudioData = null;
+    currentAudioUrl = null;
     currentFilename = null;
     currentShareUrl = null;
+    currentStreamUrl = null;
     currentNewsContent = null;
+    currentNewsText = null;
+    currentEditionId = null;
 
     const playBtn = document.getElementById('playBtn');
     const downloadBtn = document.getElementById('downloadBtn');
@@ -504,8 +545,10 @@ async function forceRefreshNews() {
         const result = await response.json();
 
         if (result.success) {
-            // 保存原始新闻内容用于复制
+            // 保存原始新闻内容；复制使用服务端预渲染的纯文本
             currentNewsContent = result.content;
+            currentNewsText = result.text || result.content;
+            currentEditionId = result.edition_id || null;
 
             // 格式化新闻内容显示
             const lines = result.content.split('\n');
@@ -577,7 +620,7 @@ function copyNews() {
     try {
         // 使用现代的 Clipboard API
         if (navigator.clipboard && window.isSecureContext) {
-            navigator.clipboard.writeText(currentNewsContent).then(() => {
+            navigator.clipboard.writeText(currentNewsText || currentNewsContent).then(() => {
                 showMessage('新闻内容已复制到剪贴板！', 'success');
 
                 // 视觉反馈
@@ -593,11 +636,11 @@ function copyNews() {
 
             }).catch(err => {
                 console.error('复制失败:', err);
-                fallbackCopyTextToClipboard(currentNewsContent);
+                fallbackCopyTextToClipboard(currentNewsText || currentNewsContent);
             });
         } else {
             // 降级方案
-            fallbackCopyTextToClipboard(currentNewsContent);
+            fallbackCopyTextToClipboard(currentNewsText || currentNewsContent);
         }
     } catch (error) {
         console.error('复制操作失败:', error);
@@ -646,7 +689,55 @@ function fallbackCopyTextToClipboard(text) {
     document.body.removeChild(textArea);
 }
 
-// 加载历史记录列表
+// 历史记录分页游标（null 表示没有更多）
+let historyNextCursor = null;
+
+// 渲染单条历史记录摘要
+function renderHistoryItem(item) {
+    const date = new Date(item.cached_time);
+    const formattedTime = date.toLocaleTimeString('zh-CN', {
+        hour: '2-digit',
+        minute: '2-digit'
+    });
+
+    // 首条标题作为预览（转义HTML特殊字符并截断长度）
+    const headline = (item.first_headline || '').replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;').replace(/'/g, '&#39;');
+    const preview = headline ? `1、${headline.substring(0, 40)}... <span class="history-date-count">共${item.item_count}条</span>` : '';
+
+    // 多版次时以版次标识（YYYY-MM-DD_HHMM）定位详情
+    const editionId = item.edition_id || item.cache_date;
+
+    return `
+        <div class="history-date-item" data-cache-date="${editionId}">
+            <div class="history-date-header">
+                <div class="history-date-title">${item.date_str}</div>
+                <div class="history-date-time">${formattedTime}</div>
+            </div>
+            <div class="history-date-preview">${preview}</div>
+            <div class="history-date-actions">
+                <button class="history-date-btn primary" data-action="view" data-cache-date="${editionId}">
+                    <i class="fas fa-eye"></i>
+                    查看详情
+                </button>
+            </div>
+        </div>
+    `;
+}
+
+// 渲染“加载更多”按钮
+function renderHistoryMoreButton() {
+    if (!historyNextCursor) return '';
+    return `
+        <div class="history-more" id="historyMore">
+            <button class="btn btn-secondary" onclick="loadMoreHistory()">
+                <i class="fas fa-chevron-down"></i>
+                加载更多
+            </button>
+        </div>
+    `;
+}
+
+// 加载历史记录列表（第一页）
 async function loadHistoryList() {
     const historyDateList = document.getElementById('historyDateList');
 
@@ -658,49 +749,17 @@ async function loadHistoryList() {
             </div>
         `;
 
-        const response = await fetch('/aizaobao/api/history');
+        const response = await fetch('/aizaobao/api/history?fields=summary');
         const result = await response.json();
 
         if (result.success && result.history.length > 0) {
-            let historyHTML = '';
-
-            result.history.forEach((item, index) => {
-                const date = new Date(item.cached_time);
-                const formattedTime = date.toLocaleTimeString('zh-CN', {
-                    hour: '2-digit',
-                    minute: '2-digit'
-                });
-
-                // 获取前2条新闻作为预览
-                const previewItems = item.news_items.slice(0, 2);
-                const preview = previewItems.map((newsItem, idx) => {
-                    // 转义HTML特殊字符并截断长度
-                    const escapedItem = newsItem.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;').replace(/"/g, '&quot;').replace(/'/g, '&#39;');
-                    return `${idx + 1}、${escapedItem.substring(0, 40)}...`;
-                }).join('<br>');
-
-                historyHTML += `
-                    <div class="history-date-item" data-cache-date="${item.cache_date}">
-                        <div class="history-date-header">
-                            <div class="history-date-title">${item.date_str}</div>
-                            <div class="history-date-time">${formattedTime}</div>
-                        </div>
-                        <div class="history-date-preview">${preview}</div>
-                        <div class="history-date-actions">
-                            <button class="history-date-btn primary" data-action="view" data-cache-date="${item.cache_date}">
-                                <i class="fas fa-eye"></i>
-                                查看详情
-                            </button>
-                        </div>
-                    </div>
-                `;
-            });
-
-            historyDateList.innerHTML = historyHTML;
+            historyNextCursor = result.next_cursor || null;
+            historyDateList.innerHTML = result.history.map(renderHistoryItem).join('') + renderHistoryMoreButton();
 
             // 添加事件委托
             setupHistoryPanelEventListeners();
         } else {
+            historyNextCursor = null;
             historyDateList.innerHTML = `
                 <div class="no-history">
                     <i class="fas fa-file-alt"></i>
@@ -722,6 +781,29 @@ async function loadHistoryList() {
     }
 }
 
+// 加载下一页历史记录
+async function loadMoreHistory() {
+    if (!historyNextCursor) return;
+    const historyDateList = document.getElementById('historyDateList');
+
+    try {
+        const response = await fetch(`/aizaobao/api/history?fields=summary&cursor=${encodeURIComponent(historyNextCursor)}`);
+        const result = await response.json();
+        if (!result.success) {
+            showMessage(result.message || '加载历史记录失败', 'error');
+            return;
+        }
+
+        const moreEl = document.getElementById('historyMore');
+        if (moreEl) moreEl.remove();
+        historyNextCursor = result.next_cursor || null;
+        historyDateList.insertAdjacentHTML('beforeend', result.history.map(renderHistoryItem).join('') + renderHistoryMoreButton());
+    } catch (error) {
+        console.error('加载更多历史记录失败:', error);
+        showMessage('加载历史记录失败', 'error');
+    }
+}
+
 // 设置历史记录面板事件监听器
 function setupHistoryPanelEventListeners() {
     const historyDateList = document.getElementById('historyDateList');
@@ -795,6 +877,8 @@ async function showHistoryDetail(cacheDate) {
             // 存储当前详情数据以供其他操作使用
             window.currentHistoryDetail = {
                 content: result.content,
+                text: result.text || result.content,
+                edition_id: result.edition_id || null,
                 date_str: result.date_str,
                 news_items: result.news_items || newsItems
             };
@@ -833,7 +917,7 @@ function copyHistoryDetail() {
         return;
     }
 
-    const content = window.currentHistoryDetail.content;
+    const content = window.currentHistoryDetail.text || window.currentHistoryDetail.content;
 
     if (navigator.clipboard && window.isSecureContext) {
         navigator.clipboard.writeText(content).then(() => {
@@ -854,7 +938,7 @@ function loadHistoryToMain() {
         return;
     }
 
-    const { content, date_str } = window.currentHistoryDetail;
+    const { content, text, edition_id, date_str } = window.currentHistoryDetail;
 
     // 解析并显示内容到主界面
     const newsContent = document.getElementById('newsContent');
@@ -876,6 +960,8 @@ function loadHistoryToMain() {
 
     // 更新当前新闻内容
     currentNewsContent = content;
+    currentNewsText = text || content;
+    currentEditionId = edition_id || null;
 
     // 启用复制按钮
     document.getElementById('copyBtn').disabled = false;
@@ -900,10 +986,10 @@ async function copyHistoryNews(cacheDate) {
 
         if (result.success) {
             if (navigator.clipboard && window.isSecureContext) {
-                await navigator.clipboard.writeText(result.content);
+                await navigator.clipboard.writeText(result.text || result.content);
                 showMessage('历史记录已复制到剪贴板！', 'success');
             } else {
-                fallbackCopyTextToClipboard(result.content);
+                fallbackCopyTextToClipboard(result.text || result.content);
             }
         } else {
             showMessage('复制失败', 'error');
@@ -967,44 +1053,52 @@ async function generateAudio() {
                 'Content-Type': 'application/json'
             },
             body: JSON.stringify({
-                text: currentNewsContent
+                text: currentNewsContent,
+                // 有版次时服务端直接使用预渲染的朗读稿
+                edition_id: currentEditionId,
+                // 流式：服务端边合成边返回，播放器收到首段音频即可开始播放
+                stream: true
             })
         });
 
-        const result = await response.json();
+        let result = await response.json();
+
+        // 服务端以任务方式合成（worker 模式）时，轮询任务状态直至完成
+        if (result.success && result.job_id && result.status !== 'done') {
+            result = await waitForTtsJob(result);
+        }
 
         if (result.success) {
             // 完成进度条
             completeProgress();
 
-            currentAudioData = result.audio_data;
+            currentAudioUrl = result.audio_url;
             currentFilename = result.filename;
             currentShareUrl = result.share_url;
+            currentStreamUrl = result.stream_url || result.audio_url;
 
-            // 延迟一秒后显示音频播放器
-            setTimeout(() => {
-                // 隐藏生成进度
-                audioGeneration.style.display = 'none';
+            // 隐藏生成进度
+            audioGeneration.style.display = 'none';
 
-                // 创建音频URL并设置到播放器
-                const audioBlob = new Blob([Uint8Array.from(atob(currentAudioData), c => c.charCodeAt(0))], { type: 'audio/mp3' });
-                const audioUrl = URL.createObjectURL(audioBlob);
-                const audioElement = document.getElementById('audioElement');
-                audioElement.src = audioUrl;
+            // 播放器直接请求流地址（已缓存时为音频文件地址）
+            const audioElement = document.getElementById('audioElement');
+            audioElement.src = currentStreamUrl;
 
-                // 显示音频播放器
-                audioPlayer.style.display = 'block';
+            // 显示音频播放器
+            audioPlayer.style.display = 'block';
+            audioElement.play().catch(e => {
+                console.error('自动播放失败:', e);
+            });
 
-                // 启用播放、下载和分享按钮
-                playBtn.disabled = false;
-                downloadBtn.disabled = false;
+            // 启用播放、下载和分享按钮
+            playBtn.disabled = false;
+            downloadBtn.disabled = false;
 
-                const shareBtn = document.getElementById('shareBtn');
-                shareBtn.disabled = false;
-                shareBtn.style.display = 'inline-flex';
+            const shareBtn = document.getElementById('shareBtn');
+            shareBtn.disabled = false;
+            shareBtn.style.display = 'inline-flex';
 
-                showMessage('音频生成成功！可以播放、下载或分享', 'success');
-            }, 1000);
+            showMessage(result.cached || result.job_id ? '音频已生成，可以播放、下载或分享' : '正在边合成边播放，完成后可下载或分享', 'success');
 
         } else {
             // 隐藏生成进度
@@ -1029,6 +1123,23 @@ async function generateAudio() {
     }
 }
 
+// 轮询语音合成任务，完成后返回带音频地址的结果
+async function waitForTtsJob(job) {
+    const filename = job.filename;
+    while (job.status === 'queued' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, 1500));
+        const response = await fetch(`/aizaobao/api/tts-jobs/${job.job_id}`);
+        job = await response.json();
+        if (!job.success) {
+            return job;
+        }
+    }
+    if (job.status !== 'done') {
+        return { success: false, message: job.error || '音频生成失败' };
+    }
+    return { ...job, success: true, filename: filename };
+}
+
 // 开始进度模拟
 function startProgressSimulation() {
     const progressFill = document.getElementById('progressFill');
@@ -1114,83 +1225,41 @@ function completeProgress() {
 
 // 播放音频
 function playAudio() {
-    if (!currentAudioData) {
+    if (!currentAudioUrl) {
         showMessage('请先生成音频', 'error');
         return;
     }
 
-    try {
-        // 将base64数据转换为Blob
-        const audioBytes = atob(currentAudioData);
-        const audioArray = new Uint8Array(audioBytes.length);
-        for (let i = 0; i < audioBytes.length; i++) {
-            audioArray[i] = audioBytes.charCodeAt(i);
-        }
-        const audioBlob = new Blob([audioArray], { type: 'audio/mpeg' });
-        const audioUrl = URL.createObjectURL(audioBlob);
-
-        // 显示音频播放器
-        const audioPlayer = document.getElementById('audioPlayer');
-        const audioElement = document.getElementById('audioElement');
-
-        audioElement.src = audioUrl;
-        audioPlayer.style.display = 'block';
+    const audioPlayer = document.getElementById('audioPlayer');
+    const audioElement = document.getElementById('audioElement');
 
-        // 自动播放
-        audioElement.play().catch(e => {
-            console.error('播放失败:', e);
-            showMessage('播放失败，请手动点击播放按钮', 'error');
-        });
+    // 流播放已结束或中断时改用缓存文件，避免重复请求流地址
+    if (!audioElement.src || audioElement.ended || audioElement.error) {
+        audioElement.src = currentAudioUrl;
+    }
+    audioPlayer.style.display = 'block';
 
-        showMessage('开始播放音频', 'success');
+    // 自动播放
+    audioElement.play().catch(e => {
+        console.error('播放失败:', e);
+        showMessage('播放失败，请手动点击播放按钮', 'error');
+    });
 
-    } catch (error) {
-        console.error('播放音频失败:', error);
-        showMessage('播放音频失败', 'error');
-    }
+    showMessage('开始播放音频', 'success');
 }
 
-// 下载音频
-async function downloadAudio() {
-    if (!currentAudioData || !currentFilename) {
+// 下载音频（服务端以附件形式返回音频文件）
+function downloadAudio() {
+    if (!currentAudioUrl) {
         showMessage('请先生成音频', 'error');
         return;
     }
 
-    try {
-        const response = await fetch('/aizaobao/api/download-audio', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                audio_data: currentAudioData,
-                filename: currentFilename
-            })
-        });
-
-        if (response.ok) {
-            // 创建下载链接
-            const blob = await response.blob();
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.href = url;
-            a.download = currentFilename;
-            document.body.appendChild(a);
-            a.click();
-            document.body.removeChild(a);
-            window.URL.revokeObjectURL(url);
-
-            showMessage('音频下载成功！', 'success');
-        } else {
-            const result = await response.json();
-            showMessage(result.message || '下载失败', 'error');
-        }
-
-    } catch (error) {
-        console.error('下载音频失败:', error);
-        showMessage('下载音频失败', 'error');
-    }
+    const a = document.createElement('a');
+    a.href = `${currentAudioUrl}?download=1&filename=${encodeURIComponent(currentFilename || 'ai_news.mp3')}`;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
 }
 
 // 工具函数：格式化时间
@@ -0,0 +1,120 @@
+"""
+抓取/语音任务进程：从版次库的 jobs 表领取任务执行（抓取、翻译、语音合成），并运行定时任务
+
+用法: CRAWL_MODE=worker python worker.py
+Web 进程（CRAWL_MODE=worker）只负责入队与读取结果，可以开多个 gunicorn worker。
+"""
+import os
+import threading
+import time
+
+# 必须在导入 app 之前设置：标记本进程直接执行抓取与语音任务
+os.environ['CRAWLER_PROCESS'] = '1'
+
+import app as aizaobao
+
+WORKER_THREADS = max(int(os.getenv('WORKER_THREADS', '2')), 1)
+POLL_INTERVAL = 1.0
+# 续约间隔：租约的三分之一，进程存活期间运行中的任务不会被其他 worker 重新领取
+HEARTBEAT_INTERVAL = max(aizaobao.JOB_LEASE_SECONDS / 3, 1)
+_running_jobs = set()
+_running_lock = threading.Lock()
+
+
+class JobFailed(Exception):
+    """任务已在内部重试过，不再重新排队"""
+
+
+def run_build_job(job):
+    """构建版次（抓取 + 各区域排序 + 默认音色音频）"""
+    payload = job['payload']
+    aizaobao._run_edition_build(payload['cache_date'], payload['slot'])
+    if aizaobao.read_news_cache(aizaobao.DEFAULT_REGION, payload['cache_date'], payload['slot']) is None:
+        raise RuntimeError('版次构建后未找到缓存')
+    return {'edition_id': aizaobao._edition_id(payload['cache_date'], payload['slot'])}
+
+
+def run_tts_job(job):
+    """语音合成（分段缓存与重试沿用进程内任务的实现），进度写回任务表"""
+    payload = job['payload']
+    tts_job = {
+        'text': payload['text'], 'config': payload['config'], 'callbacks': [],
+        'progress': {'done': 0, 'total': len(aizaobao.split_tts_segments(payload['text']))},
+        'status': 'running', 'error': None, 'share_url': None, 'attempts': 0
+    }
+    aizaobao._run_tts_job(tts_job, on_update=lambda j: aizaobao.update_job(job['id'], progress=j['progress']))
+    aizaobao.update_job(job['id'], progress=tts_job['progress'])
+    if tts_job['status'] != 'done':
+        # 语音任务内部已重试，不再重新排队
+        raise JobFailed(tts_job['error'] or '音频生成失败')
+    return {'share_url': tts_job['share_url']}
+
+
+HANDLERS = {
+    'build_edition': run_build_job,
+    'tts': run_tts_job,
+}
+
+
+def process_job(job):
+    handler = HANDLERS.get(job['kind'])
+    if handler is None:
+        aizaobao.update_job(job['id'], status='failed', error=f"未知任务类型: {job['kind']}")
+        return
+    started = time.time()
+    with _running_lock:
+        _running_jobs.add(job['id'])
+    try:
+        result = handler(job)
+        aizaobao.update_job(job['id'], status='done', result=result, error=None)
+        print(f"任务完成 #{job['id']} {job['kind']}（{time.time() - started:.1f}s）")
+    except Exception as e:
+        retry = not isinstance(e, JobFailed) and job['attempts'] < aizaobao.JOB_MAX_ATTEMPTS
+        aizaobao.update_job(job['id'], status='queued' if retry else 'failed', error=str(e))
+        print(f"任务失败 #{job['id']} {job['kind']}: {e}{'，稍后重试' if retry else ''}")
+    finally:
+        with _running_lock:
+            _running_jobs.discard(job['id'])
+
+
+def heartbeat_loop():
+    """定期刷新本进程运行中任务的 updated_at（续约）"""
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        with _running_lock:
+            job_ids = list(_running_jobs)
+        for job_id in job_ids:
+            try:
+                aizaobao.update_job(job_id)
+            except Exception as e:
+                print(f"任务续约失败 #{job_id}: {e}")
+
+
+def worker_loop():
+    while True:
+        try:
+            job = aizaobao.claim_job()
+        except Exception as e:
+            print(f"领取任务失败: {e}")
+            job = None
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        process_job(job)
+
+
+def main():
+    # 定时任务（版次构建、清理、天气看板）由持有文件锁的一个 worker 进程运行；
+    # 异常退出遗留的运行中任务在租约过期后由 claim_job 重新排队，与定时任务锁无关
+    if not aizaobao.start_background_jobs():
+        print("定时任务未启动（SCHEDULER_ENABLED=0 或已有 worker 进程在运行）")
+    threading.Thread(target=heartbeat_loop, name='job-heartbeat', daemon=True).start()
+    for i in range(WORKER_THREADS):
+        threading.Thread(target=worker_loop, name=f'job-worker-{i}', daemon=True).start()
+    print(f"任务进程已启动（{WORKER_THREADS} 个线程），等待任务...")
+    while True:
+        time.sleep(3600)
+
+
+if __name__ == '__main__':
+    main()